@@ -0,0 +1,404 @@
+"""
+Trend Analytics
+
+Keeps one small aggregate per (date, category) briefing in data/stats.json:
+story count, rated-story counts and importance/impact sums, story-category
+counts, source counts and headline keywords. Next to them it keeps running
+per-category indexes: all-time category and source counts, weekly and monthly
+rating totals, and the streaks of every headline keyword.
+
+When backend.py publishes a briefing, only that briefing's aggregate, its week
+and month totals, and the streaks of its keywords are updated. The dashboard
+snapshot (category mix, weekly/monthly average ratings, top sources,
+recurring-topic streaks) is then assembled from the indexes and stored next
+to them. /api/stats serves that stored snapshot, so answering a request never
+touches the briefing files.
+
+    python analytics.py --rebuild    # recompute everything from data/
+    python analytics.py              # print the current snapshot summary
+
+Rebuild rollups use NumPy when it is installed and plain Python otherwise.
+"""
+
+import os
+import sys
+import json
+import threading
+import heapq
+from collections import Counter
+from datetime import date, datetime, timedelta
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+from news_data import DATA_DIR, CATEGORIES, is_sample_briefing, headline_keywords, iter_briefings, store_lock
+
+STATS_FILE = os.path.join(DATA_DIR, 'stats.json')
+
+# Bumped when the stored layout changes; older stores are rebuilt
+STATS_VERSION = 2
+
+# How many sources / topics the snapshot lists
+TOP_N = 10
+# Window (days) for the "recent" category mix and top sources
+RECENT_DAYS = 30
+
+# Aggregate fields summed per week / month (each rollup row is [briefings] + these)
+ROLLUP_FIELDS = ('stories', 'importance_rated', 'importance_sum', 'impact_rated', 'impact_sum')
+
+
+def aggregate_briefing(date, category, data):
+    """Summarize one briefing's daily stories into a small aggregate"""
+    stories = [s for s in data.get('stories') or [] if isinstance(s, dict)]
+    keywords = set()
+    for story in stories:
+        keywords |= headline_keywords(str(story.get('headline', '')))
+    # Stories without an integer rating don't count towards that rating's average
+    importance = [s['importance'] for s in stories if type(s.get('importance')) is int]
+    impact = [s['impact_to_me'] for s in stories if type(s.get('impact_to_me')) is int]
+    return {
+        "date": date,
+        "category": category,
+        "stories": len(stories),
+        "importance_rated": len(importance),
+        "importance_sum": sum(importance),
+        "impact_rated": len(impact),
+        "impact_sum": sum(impact),
+        "story_categories": dict(Counter(str(s.get('category', 'Other')) for s in stories)),
+        "sources": dict(Counter(str(s.get('source', 'Unknown')) for s in stories)),
+        "keywords": sorted(keywords),
+    }
+
+
+def period_key(day, period):
+    """Start date of the week (Monday) or month containing a YYYY-MM-DD day"""
+    if period == 'week':
+        parsed = date.fromisoformat(day)
+        return (parsed - timedelta(days=parsed.weekday())).isoformat()
+    return day[:7]
+
+
+def rollup(aggregates, period):
+    """Totals per week or month: {period: [briefings, stories, importance_rated, ...]}"""
+    if not aggregates:
+        return {}
+    keys = [period_key(a['date'], period) for a in aggregates]
+
+    if NUMPY_AVAILABLE:
+        periods, index = np.unique(np.array(keys), return_inverse=True)
+        columns = np.array([[1] + [a[f] for f in ROLLUP_FIELDS] for a in aggregates], dtype=float)
+        totals = np.stack([np.bincount(index, weights=columns[:, i], minlength=len(periods))
+                           for i in range(columns.shape[1])], axis=1)
+        return {p: [int(v) for v in row] for p, row in zip(periods.tolist(), totals)}
+
+    totals = {}
+    for key, a in zip(keys, aggregates):
+        row = totals.setdefault(key, [0] * (len(ROLLUP_FIELDS) + 1))
+        row[0] += 1
+        for i, field in enumerate(ROLLUP_FIELDS, 1):
+            row[i] += a[field]
+    return totals
+
+
+def rollup_rows(totals):
+    """Snapshot rows (average ratings per period) from rollup totals"""
+    rows = []
+    for period in sorted(totals):
+        _, stories, importance_rated, importance_sum, impact_rated, impact_sum = totals[period]
+        rows.append({
+            "period": period,
+            "stories": stories,
+            "avg_importance": round(importance_sum / importance_rated, 2) if importance_rated else None,
+            "avg_impact": round(impact_sum / impact_rated, 2) if impact_rated else None,
+        })
+    return rows
+
+
+def streak(dates):
+    """[days, longest streak, last seen, streak ending on last seen] for sorted YYYY-MM-DD dates"""
+    ordinals = [date.fromisoformat(d).toordinal() for d in dates]
+    longest = run = 1
+    for previous, current in zip(ordinals, ordinals[1:]):
+        run = run + 1 if current == previous + 1 else 1
+        longest = max(longest, run)
+    return [len(dates), longest, dates[-1], run]
+
+
+def topic_days(aggregates):
+    """{keyword: [dates it appeared]} for aggregates sorted by date"""
+    days = {}
+    for a in aggregates:
+        for keyword in a['keywords']:
+            days.setdefault(keyword, []).append(a['date'])
+    return days
+
+
+def top_streaks(streaks, latest):
+    """Keywords that recur on consecutive days, with current and longest streaks"""
+    rows = (
+        {
+            "topic": keyword,
+            "current_streak": run if last_seen == latest else 0,
+            "longest_streak": longest,
+            "days": days,
+            "last_seen": last_seen,
+        }
+        for keyword, (days, longest, last_seen, run) in streaks.items()
+        if days >= 2
+    )
+    return heapq.nsmallest(TOP_N, rows, key=lambda s: (-s['current_streak'], -s['longest_streak'], -s['days'], s['topic']))
+
+
+def merge_counts(aggregates, field):
+    totals = Counter()
+    for a in aggregates:
+        totals.update(a[field])
+    return totals
+
+
+def ranked(counts, n=None):
+    """(name, count) pairs, most common first; ties by name so the order never depends on recording order"""
+    return sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:n]
+
+
+def empty_index():
+    return {"briefings": 0, "stories": 0, "category_mix": {}, "sources": {},
+            "week": {}, "month": {}, "streaks": {}}
+
+
+class StatsStore:
+    """Daily aggregates, running indexes and the derived snapshot, persisted to one JSON file"""
+
+    def __init__(self, path=STATS_FILE, load=True):
+        self.path = path
+        self.aggregates = {}
+        self.index = {}
+        self.snapshot = None
+        # True when the file was written by an older layout and needs a rebuild
+        self.stale = False
+        # {(category, keyword): {date: +1 added / -1 removed}} since the last save
+        self._dirty = {}
+        if load and os.path.exists(path):
+            with open(path, 'r') as f:
+                state = json.load(f)
+            self.snapshot = state.get('snapshot')
+            if state.get('version') != STATS_VERSION:
+                self.stale = True
+            else:
+                self.aggregates = {f"{a['date']}:{a['category']}": a for a in state.get('daily', [])}
+                self.index = state.get('index', {})
+
+    def record(self, date, category, data):
+        """Add or replace the aggregate for one published briefing, updating only what it touches"""
+        key = f"{date}:{category}"
+        old = self.aggregates.pop(key, None)
+        if old is not None:
+            self._apply(old, -1)
+        if not is_sample_briefing(data):
+            aggregate = aggregate_briefing(date, category, data)
+            self.aggregates[key] = aggregate
+            self._apply(aggregate, 1)
+
+    def _apply(self, aggregate, sign):
+        """Add (sign 1) or remove (sign -1) one aggregate from its category's indexes"""
+        category = aggregate['category']
+        index = self.index.setdefault(category, empty_index())
+        index['briefings'] += sign
+        index['stories'] += sign * aggregate['stories']
+        for field, source in (('category_mix', 'story_categories'), ('sources', 'sources')):
+            counts = index[field]
+            for name, count in aggregate[source].items():
+                counts[name] = counts.get(name, 0) + sign * count
+                if not counts[name]:
+                    del counts[name]
+        for period in ('week', 'month'):
+            key = period_key(aggregate['date'], period)
+            row = index[period].setdefault(key, [0] * (len(ROLLUP_FIELDS) + 1))
+            row[0] += sign
+            for i, field in enumerate(ROLLUP_FIELDS, 1):
+                row[i] += sign * aggregate[field]
+            if not row[0]:
+                del index[period][key]
+        for keyword in aggregate['keywords']:
+            changes = self._dirty.setdefault((category, keyword), {})
+            changes[aggregate['date']] = changes.get(aggregate['date'], 0) + sign
+        if not index['briefings']:
+            del self.index[category]
+
+    def build_index(self):
+        """Compute every index from the aggregates in bulk (used by rebuild)"""
+        self.index = {}
+        rows_by_category = {}
+        for key in sorted(self.aggregates):
+            aggregate = self.aggregates[key]
+            rows_by_category.setdefault(aggregate['category'], []).append(aggregate)
+        for category, rows in rows_by_category.items():
+            index = empty_index()
+            index['briefings'] = len(rows)
+            index['stories'] = sum(a['stories'] for a in rows)
+            index['category_mix'] = dict(merge_counts(rows, 'story_categories'))
+            index['sources'] = dict(merge_counts(rows, 'sources'))
+            index['week'] = rollup(rows, 'week')
+            index['month'] = rollup(rows, 'month')
+            index['streaks'] = {keyword: streak(dates) for keyword, dates in topic_days(rows).items()}
+            self.index[category] = index
+        self._dirty.clear()
+
+    def _update_streaks(self):
+        """Bring the streaks of keywords touched since the last save up to date"""
+        rescan = {}
+        for (category, keyword), changes in self._dirty.items():
+            index = self.index.get(category)
+            changes = [(day, n) for day, n in changes.items() if n]
+            if index is None or not changes:
+                continue
+            current = index['streaks'].get(keyword)
+            (day, n), = changes if len(changes) == 1 else [(None, 0)]
+            if n > 0 and current is None:
+                index['streaks'][keyword] = [1, 1, day, 1]
+            elif n > 0 and day > current[2]:
+                # The usual publish: a new day after the keyword was last seen
+                days, longest, last_seen, run = current
+                run = run + 1 if date.fromisoformat(day).toordinal() == date.fromisoformat(last_seen).toordinal() + 1 else 1
+                index['streaks'][keyword] = [days + 1, max(longest, run), day, run]
+            else:
+                # Backfilled or removed days: recount from the category's aggregates
+                if category not in rescan:
+                    rows = sorted((a for a in self.aggregates.values() if a['category'] == category), key=lambda a: a['date'])
+                    rescan[category] = topic_days(rows)
+                dates = rescan[category].get(keyword)
+                if dates:
+                    index['streaks'][keyword] = streak(dates)
+                else:
+                    index['streaks'].pop(keyword, None)
+        self._dirty.clear()
+
+    def build_snapshot(self):
+        """Dashboard statistics assembled from the indexes"""
+        latest_by_category = {}
+        for a in self.aggregates.values():
+            if a['date'] > latest_by_category.get(a['category'], ''):
+                latest_by_category[a['category']] = a['date']
+        latest = max(latest_by_category.values()) if latest_by_category else None
+        snapshot = {
+            "generated": datetime.now().isoformat(timespec='seconds'),
+            "first_date": min(a['date'] for a in self.aggregates.values()) if self.aggregates else None,
+            "latest_date": latest,
+            "categories": {},
+        }
+        if latest:
+            last = date.fromisoformat(latest)
+            recent_days = [(last - timedelta(days=i)).isoformat() for i in range(RECENT_DAYS)]
+        for category in sorted(self.index):
+            index = self.index[category]
+            recent = [self.aggregates[k] for k in (f"{d}:{category}" for d in recent_days) if k in self.aggregates]
+            snapshot["categories"][category] = {
+                "briefings": index['briefings'],
+                "stories": index['stories'],
+                "category_mix": dict(ranked(index['category_mix'])),
+                "recent_category_mix": dict(ranked(merge_counts(recent, 'story_categories'))),
+                "top_sources": ranked(index['sources'], TOP_N),
+                "recent_top_sources": ranked(merge_counts(recent, 'sources'), TOP_N),
+                "weekly": rollup_rows(index['week']),
+                "monthly": rollup_rows(index['month']),
+                "recurring_topics": top_streaks(index['streaks'], latest_by_category[category]),
+            }
+        return snapshot
+
+    def save(self):
+        """Refresh touched streaks and the snapshot, then write the store atomically"""
+        self._update_streaks()
+        self.snapshot = self.build_snapshot()
+        state = {
+            "version": STATS_VERSION,
+            "snapshot": self.snapshot,
+            "daily": sorted(self.aggregates.values(), key=lambda a: (a['date'], a['category'])),
+            "index": self.index,
+        }
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            # json.dumps uses the C encoder; json.dump streams through the Python one
+            f.write(json.dumps(state, separators=(',', ':')))
+        os.replace(tmp_path, self.path)
+
+
+def record_briefing(date, category, data, path=STATS_FILE):
+    """Update the stats store after backend.py publishes a briefing"""
+    # File lock: the daily job, backfills and tenant builds may run at once
+    with store_lock(path):
+        store = StatsStore(path)
+        if store.stale or not os.path.exists(path):
+            # Missing (it is not committed) or an old layout: start from every briefing, not just this one
+            print(f"{path} missing or outdated, rebuilding it from the briefing files")
+            store = _rebuild(os.path.dirname(path) or '.', path)
+        store.record(date, category, data)
+        store.save()
+
+
+def rebuild(data_dir=DATA_DIR, path=STATS_FILE):
+    """Recompute every aggregate from the briefings in data_dir (both tiers)"""
+    with store_lock(path):
+        return _rebuild(data_dir, path)
+
+
+def _rebuild(data_dir, path):
+    store = StatsStore(path, load=False)
+    for day, category, data in iter_briefings(data_dir):
+        if category in CATEGORIES and not is_sample_briefing(data):
+            store.aggregates[f"{day}:{category}"] = aggregate_briefing(day, category, data)
+    store.build_index()
+    store.save()
+    return store
+
+
+class StatsCache:
+    """The encoded /api/stats body, reloaded only when the stats file changes"""
+
+    def __init__(self, path=STATS_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._version = None
+        self._body = None
+
+    def get_json(self):
+        with self._lock:
+            try:
+                stat = os.stat(self.path)
+                version = (stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                version = None
+            if self._body is not None and version == self._version:
+                return self._body
+            if version is None:
+                # No store yet: build one from the data files
+                print(f"{self.path} not found, rebuilding statistics from {os.path.dirname(self.path) or '.'}")
+                snapshot = rebuild(os.path.dirname(self.path) or '.', self.path).snapshot
+                stat = os.stat(self.path)
+                version = (stat.st_mtime_ns, stat.st_size)
+            else:
+                with open(self.path, 'r') as f:
+                    snapshot = json.load(f).get('snapshot')
+            self._body = json.dumps(snapshot).encode()
+            self._version = version
+            return self._body
+
+
+# Shared cache used by both servers
+stats_cache = StatsCache()
+
+
+if __name__ == "__main__":
+    if '--rebuild' in sys.argv:
+        started = datetime.now()
+        store = rebuild()
+        elapsed = (datetime.now() - started).total_seconds()
+        print(f"Rebuilt {len(store.aggregates)} daily aggregates into {STATS_FILE} in {elapsed:.2f}s")
+    snapshot = StatsStore().snapshot or {}
+    print(f"Statistics from {snapshot.get('first_date')} to {snapshot.get('latest_date')}")
+    for category, stats in (snapshot.get('categories') or {}).items():
+        topics = ', '.join(f"{t['topic']} ({t['current_streak']}d)" for t in stats['recurring_topics'][:5])
+        print(f"  {category}: {stats['stories']} stories in {stats['briefings']} briefings; "
+              f"mix {stats['category_mix']}; recurring: {topics}")
@@ -13,7 +13,13 @@ import requests
 import json
 import os
 import configparser
-from datetime import datetime
+import argparse
+from datetime import datetime, timedelta
+from profiling import profiler
+from ratelimit import UpstreamLimiter, BudgetExceededError
+from prompts import SYSTEM_PROMPT, build_category_prompt
+import analytics
+import ranking
 
 def load_env_file(filepath):
     """Load environment variables from a .env file"""
@@ -37,6 +43,9 @@ load_env_file(env_file)
 # Configuration
 PERPLEXITY_API_KEY = os.environ.get('PERPLEXITY_API_KEY', '')  # Set your API key as an environment variable
 
+# API base URL; point it at a local stub (python replay.py serve) to run offline
+PERPLEXITY_API_BASE = os.environ.get('PERPLEXITY_API_BASE', 'https://api.perplexity.ai').rstrip('/')
+
 # Check if API key is set
 if not PERPLEXITY_API_KEY:
     print("WARNING: PERPLEXITY_API_KEY not set. Using sample data only.")
@@ -44,132 +53,81 @@ if not PERPLEXITY_API_KEY:
 else:
     print("PERPLEXITY_API_KEY is set. Will attempt to fetch real data from Perplexity API.")
 
-# Healthcare prompt
-HEALTHCARE_PROMPT = """
-Act as an expert healthcare industry analyst. Generate a daily briefing for a busy healthcare professional.
-Aggregate the most significant healthcare stories from the last 24 hours and the top story from the last week.
-CRITICAL: Focus ONLY on news from the last 7 days. Search for genuinely recent developments in healthcare.
+# Shared request/token/spend limiter for every Perplexity call (see ratelimit.py)
+limiter = UpstreamLimiter.from_env()
 
-The output MUST be a valid JSON object with the following structure:
-{
-  "weekly_top_story": {
-    "headline": "The headline of the most important story from the past week",
-    "summary": "A concise, one-sentence summary explaining what happened and why it matters",
-    "source": "The name of the news source",
-    "importance": 5,
-    "impact_to_me": 5,
-    "category": "Research",
-    "url": "https://example.com/article"
-  },
-  "stories": [
-    {
-      "headline": "The headline of a significant story from the last 24 hours",
-      "summary": "A concise, one-sentence summary explaining what happened and why it matters",
-      "source": "The name of the news source",
-      "importance": 4,
-      "impact_to_me": 3,
-      "category": "Policy",
-      "url": "https://example.com/article"
-    }
-  ]
-}
+# How many times to wait and retry when Perplexity answers 429 Too Many Requests
+MAX_RATE_LIMIT_RETRIES = 5
 
-Instructions:
-1. "weekly_top_story": The single most important healthcare story from the past week (must be from the last 7 days, NOT older)
-2. "stories": An array of 1-3 objects representing the most significant healthcare stories from the last 24 hours ONLY
+# Category prompts: a short suffix sent after the shared SYSTEM_PROMPT (see prompts.py)
+HEALTHCARE_PROMPT = build_category_prompt('healthcare')
+GENERAL_NEWS_PROMPT = build_category_prompt('general')
 
-For each story in "stories":
-- "headline": The original story headline
-- "summary": A concise, one-sentence summary explaining what happened and why it matters
-- "source": The name of the news source
-- "importance": An integer from 1 to 5, rating the story's overall significance:
-   * 5 - Exceptional global significance (e.g., cure for major disease, breakthrough technology that will change everything)
-   * 4 - Major significance (e.g., important policy changes, significant scientific advancement)
-   * 3 - Moderate significance (e.g., notable industry developments, regional policy changes)
-   * 2 - Minor significance (e.g., company announcements, small regulatory changes)
-   * 1 - Minimal significance (e.g., minor updates, routine news)
-- "impact_to_me": An integer from 1 to 5, rating the story's direct relevance and potential impact on a healthcare professional:
-   * 5 - Direct and significant impact on practice/patients
-   * 4 - Important for professional development/awareness
-   * 3 - Moderate relevance to work
-   * 2 - Minor relevance or indirect impact
-   * 1 - Minimal professional relevance
-- "category": A single-word category from the following list: "Policy", "Pharma", "Research", "Tech", "Business"
-- "url": A REAL, VERIFIABLE URL to the original article (NOT a placeholder)
+# Prompt used for each category, in the order main() fetches them
+CATEGORY_PROMPTS = {
+    'healthcare': HEALTHCARE_PROMPT,
+    'general': GENERAL_NEWS_PROMPT,
+}
 
-IMPORTANT: 
-1. All URLs must be real, working links to actual news articles published within the specified timeframes.
-2. Do NOT include news from before last week, even if it seems important.
-3. Focus on genuinely recent developments in healthcare.
-4. Use the Perplexity API to search for and verify current news stories.
-5. CRITICAL: The "stories" section MUST ONLY include news from the LAST 24 HOURS. This is for the DAILY section.
-6. The "weekly_top_story" can be from the last 7 days.
+def date_context(run_date):
+    """Prompt suffix that pins "the last 24 hours" to a past date for backfills"""
+    week_start = run_date - timedelta(days=6)
+    return f"""
+REFERENCE DATE: Treat {run_date:%Y-%m-%d} as today.
+- "The last 24 hours" means {run_date:%Y-%m-%d}.
+- "The last 7 days" means {week_start:%Y-%m-%d} through {run_date:%Y-%m-%d}.
+- Do NOT include any news published after {run_date:%Y-%m-%d}.
 """
 
-# General news prompt
-GENERAL_NEWS_PROMPT = """
-Act as a world news synthesizer. Generate a daily briefing for a well-informed individual who wants to stay updated on major global developments but avoid day-to-day political drama.
-Aggregate the most significant global news stories from the last 24 hours and the top story from the last week.
-CRITICAL: Focus ONLY on news from the last 7 days. Search for genuinely recent developments in global news.
-
-The output MUST be a valid JSON object with the following structure:
-{
-  "weekly_top_story": {
-    "headline": "The headline of the most important story from the past week",
-    "summary": "A concise, one-sentence summary explaining the event and its broader implications",
-    "source": "The name of the news source",
-    "importance": 5,
-    "impact_to_me": 5,
-    "category": "Science",
-    "url": "https://example.com/article"
-  },
-  "stories": [
-    {
-      "headline": "The headline of a significant story from the last 24 hours",
-      "summary": "A concise, one-sentence summary explaining the event and its broader implications",
-      "source": "The name of the news source",
-      "importance": 4,
-      "impact_to_me": 3,
-      "category": "Technology",
-      "url": "https://example.com/article"
+def build_request(prompt, run_date=None):
+    """Chat completion payload for a category prompt (optionally as of a past date)"""
+    data = {
+        "model": "sonar",  # Using the Sonar model
+        "messages": [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ]
     }
-  ]
-}
 
-Instructions:
-1. "weekly_top_story": The single most important global news story from the past week (must be from the last 7 days, NOT older)
-2. "stories": An array of 1-3 objects representing the most significant global news stories from the last 24 hours ONLY
+    # Pin the search window when regenerating a past day
+    if run_date is not None:
+        data["messages"][1]["content"] = prompt + date_context(run_date)
+        week_start = run_date - timedelta(days=6)
+        data["search_after_date_filter"] = f"{week_start.month}/{week_start.day}/{week_start.year}"
+        data["search_before_date_filter"] = f"{run_date.month}/{run_date.day}/{run_date.year}"
+    return data
 
-For each story in "stories":
-- "headline": The original story headline
-- "summary": A concise, one-sentence summary explaining the event and its broader implications
-- "source": The name of the news source
-- "importance": An integer from 1 to 5, rating the story's global significance:
-   * 5 - Exceptional global significance (e.g., major geopolitical events, groundbreaking scientific discoveries)
-   * 4 - Major significance (e.g., important international agreements, significant technological advances)
-   * 3 - Moderate significance (e.g., notable economic shifts, regional developments)
-   * 2 - Minor significance (e.g., company news, local developments)
-   * 1 - Minimal significance (e.g., routine updates, minor announcements)
-- "impact_to_me": An integer from 1 to 5, rating the story's potential impact on a typical person's life, finances, or worldview:
-   * 5 - Direct and significant impact on daily life/finances
-   * 4 - Important for general awareness and planning
-   * 3 - Moderate relevance to personal life
-   * 2 - Minor relevance or indirect impact
-   * 1 - Minimal personal relevance
-- "category": A single-word category from the following list: "Technology", "Business", "Science", "Global", "Culture"
-- "url": A REAL, VERIFIABLE URL to the original article (NOT a placeholder)
+def parse_response_content(content):
+    """Parse the briefing JSON out of a chat completion's message content"""
+    # Parse JSON (Perplexity sometimes includes markdown formatting)
+    if content.startswith('```json'):
+        content = content[7:]  # Remove ```json
+    if content.endswith('```'):
+        content = content[:-3]  # Remove ```
+        
+    # Find the first { and last } to extract only the JSON part
+    # This handles cases where Perplexity adds extra text after the JSON
+    first_brace = content.find('{')
+    last_brace = content.rfind('}')
+    
+    if first_brace != -1 and last_brace != -1 and last_brace > first_brace:
+        content = content[first_brace:last_brace+1]
+    
+    # Parse and validate JSON
+    news_data = json.loads(content)
+    
+    # Validate required fields
+    required_fields = ['weekly_top_story', 'stories']
+    for field in required_fields:
+        if field not in news_data:
+            raise ValueError(f"Invalid response format: missing required field '{field}'")
+    return news_data
 
-IMPORTANT:
-1. All URLs must be real, working links to actual news articles published within the specified timeframes.
-2. Do NOT include news from before last week, even if it seems important.
-3. Focus on genuinely recent developments in global news.
-4. Use the Perplexity API to search for and verify current news stories.
-5. CRITICAL: The "stories" section MUST ONLY include news from the LAST 24 HOURS. This is for the DAILY section.
-6. The "weekly_top_story" can be from the last 7 days.
-"""
+def fetch_news_perplexity(prompt, filename, run_date=None):
+    """Fetch news from Perplexity API and save to file
 
-def fetch_news_perplexity(prompt, filename):
-    """Fetch news from Perplexity API and save to file"""
+    Pass run_date (a date) to generate the briefing as of a past day.
+    """
     # If no API key, return None to use sample data
     if not PERPLEXITY_API_KEY:
         return None
@@ -178,7 +136,7 @@ def fetch_news_perplexity(prompt, filename):
         print(f"Fetching data from Perplexity API...")
         
         # Perplexity API endpoint
-        url = "https://api.perplexity.ai/chat/completions"
+        url = f"{PERPLEXITY_API_BASE}/chat/completions"
         
         # Headers
         headers = {
@@ -187,51 +145,50 @@ def fetch_news_perplexity(prompt, filename):
         }
         
         # Data payload
-        data = {
-            "model": "sonar",  # Using the Sonar model
-            "messages": [
-                {"role": "system", "content": "You are a helpful assistant that finds and summarizes current news."},
-                {"role": "user", "content": prompt}
-            ]
-        }
-        
-        # Make the API request
-        response = requests.post(url, headers=headers, json=data)
-        response.raise_for_status()  # Raise an exception for bad status codes
+        data = build_request(prompt, run_date)
         
-        # Extract and parse JSON
-        content = response.json()["choices"][0]["message"]["content"]
-        
-        # Parse JSON (Perplexity sometimes includes markdown formatting)
-        if content.startswith('```json'):
-            content = content[7:]  # Remove ```json
-        if content.endswith('```'):
-            content = content[:-3]  # Remove ```
-            
-        # Find the first { and last } to extract only the JSON part
-        # This handles cases where Perplexity adds extra text after the JSON
-        first_brace = content.find('{')
-        last_brace = content.rfind('}')
-        
-        if first_brace != -1 and last_brace != -1 and last_brace > first_brace:
-            content = content[first_brace:last_brace+1]
-        
-        # Parse and validate JSON
-        news_data = json.loads(content)
-        
-        # Validate required fields
-        required_fields = ['weekly_top_story', 'stories']
-        for field in required_fields:
-            if field not in news_data:
-                raise ValueError(f"Invalid response format: missing required field '{field}'")
+        # Make the API request, queueing behind the shared rate limiter
+        estimated_tokens = limiter.estimate_tokens(*(m["content"] for m in data["messages"]))
+        reservation = None
+        try:
+            for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+                reservation = limiter.acquire(estimated_tokens)
+                response = requests.post(url, headers=headers, json=data)
+                if response.status_code != 429 or attempt == MAX_RATE_LIMIT_RETRIES:
+                    break
+                limiter.release(reservation)
+                reservation = None
+                # Back off every process sharing the limiter, honouring Retry-After
+                retry_after = response.headers.get('Retry-After', '')
+                delay = float(retry_after) if retry_after.replace('.', '', 1).isdigit() else 2 ** attempt * 5
+                print(f"Rate limited by Perplexity API, retrying in {delay:.0f}s...")
+                limiter.pause(delay)
+            response.raise_for_status()  # Raise an exception for bad status codes
+
+            # Extract and parse JSON
+            response_json = response.json()
+            cost = limiter.record(response_json.get("usage"), estimated_tokens, reservation)
+            reservation = None
+        finally:
+            # A failed call frees its share of the daily budget
+            limiter.release(reservation)
+        print(f"Request cost ${cost:.4f} (${limiter.spent_today():.4f} spent today)")
+        content = response_json["choices"][0]["message"]["content"]
+        news_data = parse_response_content(content)
         
-        # Save to file with today's date
-        with open(filename, 'w') as f:
+        # Save to file with today's date (write then rename, so an
+        # interrupted run never leaves a half-written file behind)
+        tmp_filename = f"{filename}.tmp"
+        with open(tmp_filename, 'w') as f:
             json.dump(news_data, f, indent=2)
+        os.replace(tmp_filename, filename)
             
         print(f"Successfully saved {filename}")
         return news_data
         
+    except BudgetExceededError as e:
+        print(f"Skipping request: {e}")
+        return None
     except json.JSONDecodeError as e:
         print(f"Error parsing JSON response: {e}")
         print(f"Response content: {content}")
@@ -247,29 +204,47 @@ def main():
     # Fetch healthcare news
     print("Fetching healthcare news...")
     healthcare_file = f"data/{today}-healthcare.json"
-    healthcare_data = fetch_news_perplexity(HEALTHCARE_PROMPT, healthcare_file)
-    
-    # If API call failed, save sample data
-    if healthcare_data is None:
-        print("Using sample healthcare data...")
-        with open(healthcare_file, 'w') as f:
-            json.dump(sample_healthcare_data(), f, indent=2)
-        print(f"Saved sample data to {healthcare_file}")
+    healthcare_data = fetch_or_keep(HEALTHCARE_PROMPT, healthcare_file, sample_healthcare_data)
+    update_indexes(today, 'healthcare', healthcare_data)
     
     # Fetch general news
     print("Fetching general news...")
     general_file = f"data/{today}-general.json"
-    general_data = fetch_news_perplexity(GENERAL_NEWS_PROMPT, general_file)
-    
-    # If API call failed, save sample data
-    if general_data is None:
-        print("Using sample general data...")
-        with open(general_file, 'w') as f:
-            json.dump(sample_general_data(), f, indent=2)
-        print(f"Saved sample data to {general_file}")
+    general_data = fetch_or_keep(GENERAL_NEWS_PROMPT, general_file, sample_general_data)
+    update_indexes(today, 'general', general_data)
     
     print("News fetching complete!")
 
+def fetch_or_keep(prompt, filename, sample_data):
+    """Fetch a briefing; if the call fails, keep a valid file from an earlier run, else save sample data"""
+    news_data = fetch_news_perplexity(prompt, filename)
+    if news_data is not None:
+        return news_data
+    # Imported here because backfill imports this module
+    from backfill import is_valid_data_file
+    if is_valid_data_file(filename):
+        # e.g. a re-run after the daily budget ran out: never replace real news with samples
+        print(f"Keeping the briefing already in {filename}")
+        with open(filename, 'r') as f:
+            return json.load(f)
+    print("Using sample data...")
+    with open(filename, 'w') as f:
+        json.dump(sample_data(), f, indent=2)
+    print(f"Saved sample data to {filename}")
+    return sample_data()
+
+def update_indexes(date, category, news_data):
+    """Fold a published briefing into the trend statistics (analytics.py) and story features (ranking.py)"""
+    # Both can be rebuilt later; never fail the fetch over them
+    try:
+        analytics.record_briefing(date, category, news_data)
+    except Exception as e:
+        print(f"Error updating statistics for {date} {category}: {e}")
+    try:
+        ranking.record_briefing(date, category, news_data)
+    except Exception as e:
+        print(f"Error updating story features for {date} {category}: {e}")
+
 def sample_healthcare_data():
     """Return sample healthcare data with the new structure"""
     return {
@@ -386,7 +361,36 @@ def sample_general_data():
         ]
     }
 
+def parse_args():
+    """Command line options; with no options the script fetches today's news"""
+    parser = argparse.ArgumentParser(description="Fetch news briefings from the Perplexity API")
+    parser.add_argument('--from', dest='start', help="Backfill start date (YYYY-MM-DD)")
+    parser.add_argument('--to', dest='end', help="Backfill end date (YYYY-MM-DD, default: today)")
+    parser.add_argument('--category', action='append', choices=sorted(CATEGORY_PROMPTS),
+                        help="Category to backfill (repeatable, default: all)")
+    parser.add_argument('--workers', type=int, default=4, help="Concurrent API requests during a backfill")
+    parser.add_argument('--rpm', type=float, help="Override PERPLEXITY_RPM for this run")
+    parser.add_argument('--force', action='store_true',
+                        help="Re-score dates that already have valid files (e.g. after a prompt change)")
+    parser.add_argument('--tenants', nargs='?', const='tenants.json', metavar='CONFIG',
+                        help="After today's fetch, build per-tenant briefings (see tenants.py)")
+    parser.add_argument('--checkpoint', default='.backfill-checkpoint.json',
+                        help="Progress file used to resume an interrupted backfill")
+    return parser.parse_args()
+
 if __name__ == "__main__":
+    args = parse_args()
     # Create data directory if it doesn't exist
     os.makedirs('data', exist_ok=True)
-    main()
\ No newline at end of file
+    # Set NEWS_PROFILE_BACKEND=1 to profile a full ingest run
+    with profiler.profile('backend-main', force=bool(os.environ.get('NEWS_PROFILE_BACKEND'))):
+        if args.start:
+            from backfill import run_backfill
+            end = args.end or datetime.now().strftime('%Y-%m-%d')
+            run_backfill(args.start, end, categories=args.category, workers=args.workers,
+                         rpm=args.rpm, force=args.force, checkpoint_file=args.checkpoint)
+        else:
+            main()
+            if args.tenants:
+                from tenants import run_tenants
+                run_tenants(config_path=args.tenants, workers=args.workers)
\ No newline at end of file
@@ -0,0 +1,191 @@
+"""
+Backfill / Re-scoring Batch Mode
+
+Regenerates briefings for a range of past dates, e.g. after a prompt change:
+
+    python backend.py --from 2025-09-01 --to 2025-09-30
+    python backend.py --from 2025-09-01 --category healthcare --force
+
+Each (category, date) pair is one job. Jobs run on a bounded worker pool and
+queue on the shared upstream limiter (ratelimit.py), so throughput is set by
+the API rate limit rather than by running one request at a time. Finished
+jobs are recorded in a checkpoint file, so an interrupted run picks up where
+it left off.
+"""
+
+import os
+import json
+import hashlib
+import threading
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import backend
+from news_data import is_sample_briefing, load_briefing
+
+
+class Checkpoint:
+    """Set of finished job keys, persisted to a JSON file after every change.
+
+    Forced re-scores also get a record of their own in `runs`, keyed by
+    run id, so an interrupted --force run resumes instead of starting over.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.done = set()
+        self.failed = {}
+        self.runs = {}
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'r') as f:
+                    state = json.load(f)
+                self.done = set(state.get('done', []))
+                self.failed = state.get('failed', {})
+                self.runs = state.get('runs', {})
+            except (OSError, ValueError) as e:
+                print(f"Ignoring unreadable checkpoint {path}: {e}")
+
+    def run_done(self, run_id):
+        """Keys already finished by a forced run"""
+        return set(self.runs.get(run_id, {}).get('done', []))
+
+    def start_run(self, run_id, args):
+        with self._lock:
+            if run_id not in self.runs:
+                self.runs[run_id] = {"args": args, "started": datetime.now().isoformat(timespec='seconds'), "done": []}
+                self._save()
+
+    def finish_run(self, run_id):
+        with self._lock:
+            self.runs.pop(run_id, None)
+            self._save()
+
+    def mark(self, key, error=None, run_id=None):
+        with self._lock:
+            if error is None:
+                self.done.add(key)
+                self.failed.pop(key, None)
+                if run_id in self.runs:
+                    self.runs[run_id]['done'].append(key)
+            else:
+                self.failed[key] = error
+            self._save()
+
+    def _save(self):
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({"done": sorted(self.done), "failed": self.failed, "runs": self.runs}, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+def forced_run_id(start, end, categories):
+    """Id of a --force run: its arguments plus the prompts it re-scores with.
+
+    Rerunning the same command resumes it; a new prompt change starts a new run.
+    """
+    prompts = [backend.SYSTEM_PROMPT] + [backend.CATEGORY_PROMPTS[c] for c in sorted(categories)]
+    digest = hashlib.sha256('\0'.join(prompts).encode()).hexdigest()[:12]
+    return f"{start}..{end}:{','.join(sorted(categories))}:{digest}"
+
+
+def date_range(start, end):
+    """Yield every date from start to end inclusive (YYYY-MM-DD strings)"""
+    day = datetime.strptime(start, '%Y-%m-%d').date()
+    last = datetime.strptime(end, '%Y-%m-%d').date()
+    while day <= last:
+        yield day
+        day += timedelta(days=1)
+
+
+def is_valid_data_file(filename):
+    """True if filename holds a real (non-sample) briefing"""
+    try:
+        with open(filename, 'r') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return False
+    return is_valid_briefing(data)
+
+
+def is_valid_briefing(data):
+    """True if data is a real (non-sample) briefing"""
+    if not isinstance(data, dict) or 'weekly_top_story' not in data or not data.get('stories'):
+        return False
+    return not is_sample_briefing(data)
+
+
+def plan_jobs(start, end, categories, checkpoint, force=False, data_dir='data', run_id=None):
+    """List the (category, date, filename) jobs that still need to run"""
+    jobs = []
+    run_done = checkpoint.run_done(run_id) if run_id else set()
+    for day in date_range(start, end):
+        for category in categories:
+            key = f"{day:%Y-%m-%d}:{category}"
+            filename = os.path.join(data_dir, f"{day:%Y-%m-%d}-{category}.json")
+            if key in run_done:
+                continue
+            if not force and (key in checkpoint.done or is_valid_data_file(filename)):
+                continue
+            # Days compacted into data/archive/ (see retention.py) are done too
+            if not force and not os.path.exists(filename) and \
+                    is_valid_briefing(load_briefing(f"{day:%Y-%m-%d}", category, data_dir)):
+                continue
+            jobs.append((category, day, filename))
+    return jobs
+
+
+def run_backfill(start, end, categories=None, workers=4, rpm=None, force=False,
+                 checkpoint_file='.backfill-checkpoint.json', data_dir='data'):
+    """Regenerate briefings for every (category, date) in [start, end]"""
+    if not backend.PERPLEXITY_API_KEY:
+        print("PERPLEXITY_API_KEY not set; backfill needs the API and will not write sample data.")
+        return {"done": 0, "failed": 0, "skipped": 0}
+
+    categories = categories or list(backend.CATEGORY_PROMPTS)
+    checkpoint = Checkpoint(checkpoint_file)
+    # A forced re-score ignores earlier progress but keeps its own, so it can resume
+    run_id = forced_run_id(start, end, categories) if force else None
+    if run_id:
+        checkpoint.start_run(run_id, {"from": start, "to": end, "categories": sorted(categories)})
+    jobs = plan_jobs(start, end, categories, checkpoint, force=force, data_dir=data_dir, run_id=run_id)
+    total = len(list(date_range(start, end))) * len(categories)
+    print(f"Backfill {start}..{end}: {len(jobs)} jobs to run, {total - len(jobs)} already done")
+
+    if rpm:
+        backend.limiter.rpm = float(rpm)
+
+    def run_job(category, day, filename):
+        print(f"Fetching {category} news for {day:%Y-%m-%d}...")
+        data = backend.fetch_news_perplexity(backend.CATEGORY_PROMPTS[category], filename, run_date=day)
+        if data is None:
+            return False
+        backend.update_indexes(f"{day:%Y-%m-%d}", category, data)
+        return True
+
+    done = failed = 0
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {pool.submit(run_job, *job): job for job in jobs}
+        for future in as_completed(futures):
+            category, day, _ = futures[future]
+            key = f"{day:%Y-%m-%d}:{category}"
+            try:
+                ok = future.result()
+                error = None if ok else "fetch failed"
+            except Exception as e:
+                ok, error = False, str(e)
+            checkpoint.mark(key, error, run_id)
+            if ok:
+                done += 1
+            else:
+                failed += 1
+                print(f"Backfill job {key} failed: {error}")
+
+    # Keep an incomplete forced run's record so a rerun retries only what is left
+    if run_id and not failed:
+        checkpoint.finish_run(run_id)
+    print(f"Backfill complete: {done} written, {failed} failed, {total - len(jobs)} skipped")
+    return {"done": done, "failed": failed, "skipped": total - len(jobs)}
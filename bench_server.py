@@ -0,0 +1,182 @@
+"""
+Loopback benchmark for simple_server.py static file serving.
+
+Starts the stdlib SimpleHTTPRequestHandler (HTTP/1.0, one connection per
+request) and NewsDashboardHandler (cached files, HTTP/1.1 keep-alive) in a
+child process, so client and server don't share a GIL, and fetches the
+dashboard's static assets from each with several client processes. The server
+process runs Python code on one core at a time. It also reports the server
+process's CPU time per request: when the clients compete for the same cores,
+req/s partly measures them, and server CPU per request is the handler's own cost.
+
+It then times a dashboard page load (HTML, CSS, JS, index.json and both
+category files) against the old HTTP/1.0 setup, one keep-alive connection,
+and one pipelined connection, and counts the round trips each needs.
+
+    python bench_server.py [requests] [clients]
+"""
+
+import os
+import sys
+import time
+import socket
+import http.client
+import http.server
+import threading
+import socketserver
+import multiprocessing
+
+import simple_server
+
+# The assets a dashboard page load fetches
+ASSETS = ['/index.html', '/css/styles.css', '/js/main.js', '/data/index.json']
+
+# Every request of one dashboard page load
+PAGE_LOAD = ASSETS + ['/api/healthcare', '/api/general']
+
+
+def serve(handler, threaded, ports, stop):
+    """Child process: run a server on a free loopback port, report the port, then its CPU time once stopped"""
+    server_class = simple_server.PooledHTTPServer if threaded else socketserver.TCPServer
+    server = server_class(('127.0.0.1', 0), handler)
+    ports.put(server.server_address[1])
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    stop.wait()
+    times = os.times()
+    ports.put(times.user + times.system)
+
+
+def start_server(handler, threaded):
+    """Start a server in a child process; returns (process, port, cpu) where cpu() stops it and returns its CPU seconds"""
+    ports = multiprocessing.Queue()
+    stop = multiprocessing.Event()
+    process = multiprocessing.Process(target=serve, args=(handler, threaded, ports, stop), daemon=True)
+    process.start()
+
+    def cpu():
+        stop.set()
+        seconds = ports.get()
+        process.terminate()
+        process.join()
+        return seconds
+    return process, ports.get(), cpu
+
+
+def fetch_all(port, paths, keep_alive):
+    """Fetch every path in order; returns total bytes received"""
+    received = 0
+    conn = http.client.HTTPConnection('127.0.0.1', port)
+    for path in paths:
+        if not keep_alive:
+            conn = http.client.HTTPConnection('127.0.0.1', port)
+        conn.request('GET', path)
+        response = conn.getresponse()
+        received += len(response.read())
+        if response.status != 200:
+            raise RuntimeError(f"{path} returned {response.status}")
+        if not keep_alive:
+            conn.close()
+    conn.close()
+    return received
+
+
+def client(args):
+    port, count, keep_alive = args
+    return fetch_all(port, [ASSETS[i % len(ASSETS)] for i in range(count)], keep_alive)
+
+
+def bench(name, handler, threaded, keep_alive, requests, clients):
+    process, port, cpu = start_server(handler, threaded)
+    try:
+        fetch_all(port, ASSETS, keep_alive)  # warm up caches
+        with multiprocessing.Pool(clients) as pool:
+            started = time.perf_counter()
+            received = sum(pool.map(client, [(port, requests // clients, keep_alive)] * clients))
+            elapsed = time.perf_counter() - started
+        server_cpu = cpu()
+    finally:
+        process.terminate()
+        process.join()
+    total = requests // clients * clients
+    # On loopback the clients share the CPU, so req/s partly measures them;
+    # server CPU per request is the handler's own cost
+    print(f"{name:<40} {total / elapsed:>9.0f} req/s  {received / elapsed / 1e6:>7.1f} MB/s  "
+          f"{server_cpu / total * 1e6:>5.0f} us server CPU/req")
+    return total / elapsed, server_cpu / total
+
+
+def read_response(reader):
+    """Read one HTTP/1.1 response from a socket file; returns (status, body)"""
+    status = int(reader.readline().split()[1])
+    length = 0
+    while True:
+        line = reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.partition(b':')
+        if name.strip().lower() == b'content-length':
+            length = int(value)
+    return status, reader.read(length)
+
+
+def page_load_pipelined(port, paths):
+    """Send every request up front on one connection, then read the responses"""
+    with socket.create_connection(('127.0.0.1', port)) as sock:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.sendall(b''.join(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode() for path in paths))
+        reader = sock.makefile('rb')
+        for path in paths:
+            status, _ = read_response(reader)
+            if status != 200:
+                raise RuntimeError(f"{path} returned {status}")
+
+
+def bench_page_load(name, handler, threaded, mode, loads=200):
+    """Average time for one dashboard page load; mode is 'close', 'keep-alive' or 'pipelined'"""
+    process, port, _ = start_server(handler, threaded)
+    try:
+        started = time.perf_counter()
+        for _ in range(loads):
+            if mode == 'pipelined':
+                page_load_pipelined(port, PAGE_LOAD)
+            else:
+                fetch_all(port, PAGE_LOAD, mode == 'keep-alive')
+        elapsed = time.perf_counter() - started
+    finally:
+        process.terminate()
+        process.join()
+    # Each new connection costs a handshake round trip; each waited-on response another
+    connections = len(PAGE_LOAD) if mode == 'close' else 1
+    waits = 1 if mode == 'pipelined' else len(PAGE_LOAD)
+    print(f"{name:<40} {connections:>2} connections, {connections + waits:>2} round trips, "
+          f"{elapsed / loads * 1000:>6.2f} ms per page load")
+
+
+class QuietStdlibHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class QuietDashboardHandler(simple_server.NewsDashboardHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class QuietHTTP10DashboardHandler(QuietDashboardHandler):
+    """The dashboard handler as it was before keep-alive: one request per connection"""
+    protocol_version = 'HTTP/1.0'
+
+
+if __name__ == "__main__":
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 4000
+    clients = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    baseline = bench("stdlib SimpleHTTPRequestHandler", QuietStdlibHandler, False, False, requests, clients)
+    cached = bench("NewsDashboardHandler, new connections", QuietDashboardHandler, True, False, requests, clients)
+    keep_alive = bench("NewsDashboardHandler, keep-alive", QuietDashboardHandler, True, True, requests, clients)
+    print(f"Speedup: {cached[0] / baseline[0]:.1f}x on new connections, {keep_alive[0] / baseline[0]:.1f}x with keep-alive")
+    print(f"Server CPU per request: {baseline[1] / cached[1]:.1f}x less on new connections, "
+          f"{baseline[1] / keep_alive[1]:.1f}x less with keep-alive")
+    print()
+    bench_page_load("page load, HTTP/1.0 (before)", QuietHTTP10DashboardHandler, False, 'close')
+    bench_page_load("page load, keep-alive", QuietDashboardHandler, True, 'keep-alive')
+    bench_page_load("page load, keep-alive + pipelining", QuietDashboardHandler, True, 'pipelined')
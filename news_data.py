@@ -0,0 +1,377 @@
+"""
+Shared News Data Loader
+
+Finds the latest briefing file for each category in data/ and keeps it in
+memory, together with its JSON response already encoded, for server.py and
+simple_server.py. Entries are refreshed when the data directory or the file
+changes, so a new briefing written by backend.py is served on the next
+request without a restart.
+
+Briefings live in two tiers (see retention.py): recent days as individual
+data/YYYY-MM-DD-<category>.json files, older days in gzipped monthly bundles
+data/archive/YYYY-MM.json.gz. iter_briefings() and load_briefing() read
+both.
+"""
+
+import os
+import re
+import gzip
+import json
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: only threads of one process are serialized
+    fcntl = None
+
+DATA_DIR = 'data'
+
+# Categories served by the API, in display order
+CATEGORIES = ('healthcare', 'general')
+
+# Briefing files are named YYYY-MM-DD-<category>.json
+DATA_FILE_PATTERN = re.compile(r'^(\d{4}-\d{2}-\d{2})-([a-z]+)\.json$')
+
+# Monthly bundles of older briefings: data/archive/YYYY-MM.json.gz
+ARCHIVE_DIR = os.path.join(DATA_DIR, 'archive')
+ARCHIVE_FILE_PATTERN = re.compile(r'^(\d{4}-\d{2})\.json\.gz$')
+
+# Served when no data file exists for a category
+SAMPLE_DATA = {
+    'healthcare': {
+        "weekly_top_story": {
+            "headline": "Revolutionary CAR-T Cell Therapy Shows 90% Remission Rate in Pediatric Leukemia",
+            "summary": "A new CAR-T cell therapy targeting pediatric leukemia has demonstrated remarkable efficacy in Phase II trials, with 90% of patients achieving complete remission after six months.",
+            "source": "The Lancet",
+            "importance": 5,
+            "impact_to_me": 5,
+            "category": "Research",
+            "url": "https://www.thelancet.com/article"
+        },
+        "stories": [
+            {
+                "headline": "FDA Announces New Fast-Track Program for Gene Therapies",
+                "summary": "The FDA has unveiled a new expedited review pathway aimed at accelerating the approval of gene therapies for rare diseases, potentially cutting approval times by up to 50%.",
+                "source": "STAT News",
+                "importance": 5,
+                "impact_to_me": 4,
+                "category": "Policy",
+                "url": "https://www.statnews.com/fda-fast-track"
+            },
+            {
+                "headline": "AI Diagnostic Tool Achieves Radiologist-Level Accuracy",
+                "summary": "A new artificial intelligence system for detecting lung cancer on CT scans has matched or exceeded the diagnostic accuracy of experienced radiologists in a large clinical trial.",
+                "source": "NEJM",
+                "importance": 4,
+                "impact_to_me": 4,
+                "category": "Tech",
+                "url": "https://www.nejm.org/ai-diagnostic"
+            },
+            {
+                "headline": "Telehealth Reimbursement Rules Expanded for Rural Areas",
+                "summary": "CMS has expanded Medicare reimbursement for telehealth services in rural communities, removing geographic restrictions that previously limited access to virtual care.",
+                "source": "Fierce Healthcare",
+                "importance": 4,
+                "impact_to_me": 3,
+                "category": "Policy",
+                "url": "https://www.fiercehealthcare.com/telehealth"
+            }
+        ]
+    },
+    'general': {
+        "weekly_top_story": {
+            "headline": "Breakthrough in Nuclear Fusion Energy Achieved",
+            "summary": "Scientists at a major research facility have achieved a net energy gain in nuclear fusion, bringing humanity one step closer to unlimited clean energy.",
+            "source": "AP News",
+            "importance": 5,
+            "impact_to_me": 5,
+            "category": "Science",
+            "url": "https://www.apnews.com/fusion-energy"
+        },
+        "stories": [
+            {
+                "headline": "Quantum Supremacy Claimed by Three Major Tech Companies",
+                "summary": "Google, IBM, and a leading Chinese tech firm have simultaneously announced they've achieved quantum supremacy, solving complex problems in minutes that would take traditional supercomputers millennia.",
+                "source": "The Economist",
+                "importance": 5,
+                "impact_to_me": 5,
+                "category": "Technology",
+                "url": "https://www.economist.com/quantum-supremacy"
+            },
+            {
+                "headline": "Global AI Regulation Framework Agreed by G7 Nations",
+                "summary": "G7 countries have reached a preliminary agreement on a unified framework for AI governance, establishing new standards for transparency and safety in artificial intelligence development.",
+                "source": "Reuters",
+                "importance": 5,
+                "impact_to_me": 4,
+                "category": "Global",
+                "url": "https://www.reuters.com/ai-regulation"
+            },
+            {
+                "headline": "Renewable Energy Investments Surpass Fossil Fuels for First Time",
+                "summary": "Global investment in renewable energy projects has exceeded fossil fuel investments for the first time in history, signaling a major shift in the energy sector's trajectory.",
+                "source": "BBC",
+                "importance": 4,
+                "impact_to_me": 3,
+                "category": "Business",
+                "url": "https://www.bbc.com/renewable-energy"
+            }
+        ]
+    },
+}
+
+
+def list_data_files(data_dir=DATA_DIR):
+    """Map each category to its data files, newest first"""
+    files = {}
+    for filename in os.listdir(data_dir):
+        match = DATA_FILE_PATTERN.match(filename)
+        if match:
+            files.setdefault(match.group(2), []).append(filename)
+    for names in files.values():
+        names.sort(reverse=True)
+    return files
+
+
+def get_latest_data_file(category, data_dir=DATA_DIR):
+    """Get the path of the most recent data file for a category, or None"""
+    try:
+        names = list_data_files(data_dir).get(category)
+    except OSError as e:
+        print(f"Error finding latest {category} file: {e}")
+        return None
+    return os.path.join(data_dir, names[0]) if names else None
+
+
+def archive_path(month, data_dir=DATA_DIR):
+    """Path of the bundle holding a month (YYYY-MM) of archived briefings"""
+    return os.path.join(data_dir, 'archive', f"{month}.json.gz")
+
+
+def read_archive(path):
+    """{filename: briefing} for every briefing in a monthly bundle"""
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        return json.load(f)['briefings']
+
+
+@lru_cache(maxsize=4)
+def _cached_archive(path, version):
+    # version (mtime, size) is only part of the key, so a rewritten bundle is re-read
+    return read_archive(path)
+
+
+def load_briefing(date, category, data_dir=DATA_DIR):
+    """The briefing for one day from either tier, or None if there is none"""
+    filename = f"{date}-{category}.json"
+    if not DATA_FILE_PATTERN.match(filename):
+        return None
+    try:
+        with open(os.path.join(data_dir, filename), 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        pass
+    path = archive_path(date[:7], data_dir)
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return _cached_archive(path, (stat.st_mtime_ns, stat.st_size)).get(filename)
+
+
+def iter_briefings(data_dir=DATA_DIR, since=None):
+    """Yield (date, category, data) for every briefing in both tiers, oldest first.
+
+    Pass since (YYYY-MM-DD) to skip older days; bundles for earlier months
+    are then not opened at all.
+    """
+    sources = {}
+    archive_dir = os.path.join(data_dir, 'archive')
+    if os.path.isdir(archive_dir):
+        for name in sorted(os.listdir(archive_dir)):
+            match = ARCHIVE_FILE_PATTERN.match(name)
+            if not match or (since and match.group(1) < since[:7]):
+                continue
+            try:
+                bundle = read_archive(os.path.join(archive_dir, name))
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Skipping archive {name}: {e}")
+                continue
+            sources.update(bundle)
+    for filename in os.listdir(data_dir):
+        if DATA_FILE_PATTERN.match(filename):
+            # A file in the hot tier wins over an archived copy of the same day
+            sources[filename] = None
+
+    for filename in sorted(sources):
+        day, category = DATA_FILE_PATTERN.match(filename).groups()
+        if since and day < since:
+            continue
+        data = sources[filename]
+        if data is None:
+            try:
+                with open(os.path.join(data_dir, filename), 'r') as f:
+                    data = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Skipping {filename}: {e}")
+                continue
+        yield day, category, data
+
+
+_store_thread_locks = {}
+_store_thread_locks_guard = threading.Lock()
+
+
+@contextmanager
+def store_lock(path):
+    """Exclusive lock for a read-modify-write of a derived store (stats, features).
+
+    Held across threads and, through flock on a <path>.lock sidecar file,
+    across processes, so the daily job, backfills and tenant builds never
+    overwrite each other's updates.
+    """
+    with _store_thread_locks_guard:
+        thread_lock = _store_thread_locks.setdefault(os.path.abspath(path), threading.Lock())
+    with thread_lock:
+        if fcntl is None:
+            yield
+            return
+        with open(f"{path}.lock", 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def is_sample_briefing(data):
+    """True if a briefing is backend.py's sample fallback (marked "Test Data:")"""
+    stories = [data.get('weekly_top_story') or {}] + list(data.get('stories') or [])
+    return any(str(story.get('headline', '')).startswith('Test Data:') for story in stories)
+
+
+# Words that carry no topic on their own
+STOPWORDS = frozenset("""
+    a about after against amid among an and are as at be been but by for from has have in into is it its
+    new of on or over says said than that the their this to under up was were what will with without
+    """.split())
+
+
+def headline_keywords(text):
+    """Lowercase topic words in a headline, used to spot recurring topics"""
+    words = (re.sub(r"'s$", '', w).strip("'-") for w in re.findall(r"[a-z0-9][a-z0-9'-]*", text.lower()))
+    return {w for w in words if len(w) > 3 and w not in STOPWORDS}
+
+
+def frontend_view(raw_data):
+    """The part of a briefing the frontend uses"""
+    return {
+        "weekly_top_story": raw_data["weekly_top_story"],
+        "stories": raw_data["stories"]
+    }
+
+
+class NewsDataCache:
+    """Latest briefing per category, kept in memory with pre-encoded JSON"""
+
+    def __init__(self, data_dir=DATA_DIR):
+        self.data_dir = data_dir
+        self._lock = threading.Lock()
+        self._dir_version = None
+        self._latest_files = {}
+        # category -> (file version, data, encoded JSON)
+        self._entries = {}
+        # (healthcare version, general version) -> encoded /api/latest body
+        self._latest_body = (None, None)
+
+    def _refresh_file_list(self):
+        """Re-list the data directory only when its mtime changes"""
+        try:
+            version = os.stat(self.data_dir).st_mtime_ns
+        except OSError:
+            version = None
+        if version == self._dir_version:
+            return
+        try:
+            files = list_data_files(self.data_dir) if version is not None else {}
+        except OSError as e:
+            print(f"Error listing {self.data_dir}: {e}")
+            files = {}
+        # Every file per category, newest first, so a broken newest file can fall back
+        self._latest_files = {
+            category: [os.path.join(self.data_dir, name) for name in names] for category, names in files.items()
+        }
+        self._dir_version = version
+
+    def _load_newest_valid(self, category, paths):
+        """Frontend view of the newest briefing in paths that loads and has the expected shape"""
+        for path in paths:
+            try:
+                with open(path, 'r') as f:
+                    data = frontend_view(json.load(f))
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                print(f"Error loading {path}: {e}")
+                continue
+            if isinstance(data['weekly_top_story'], dict) and isinstance(data['stories'], list):
+                return data
+            print(f"Error loading {path}: not a briefing")
+        raise ValueError(f"No valid {category} briefing in {self.data_dir}")
+
+    def _entry(self, category):
+        """Return (version, data, body) for a category, reloading if needed"""
+        with self._lock:
+            self._refresh_file_list()
+            paths = self._latest_files.get(category) or []
+            try:
+                stat = os.stat(paths[0]) if paths else None
+            except OSError:
+                stat = None
+            # The whole list is part of the version: a fallback goes stale when files come or go
+            version = (tuple(paths), stat.st_mtime_ns, stat.st_size) if stat else None
+
+            entry = self._entries.get(category)
+            if entry is not None and entry[0] == version:
+                return entry
+
+            if version is not None:
+                data = self._load_newest_valid(category, paths)
+            else:
+                # No briefing generated yet: show the built-in sample
+                data = SAMPLE_DATA.get(category)
+                if data is None:
+                    raise KeyError(category)
+            entry = (version, data, json.dumps(data).encode())
+            self._entries[category] = entry
+            return entry
+
+    def get(self, category):
+        """Latest briefing for a category (sample data if there is none)"""
+        return self._entry(category)[1]
+
+    def get_json(self, category):
+        """Latest briefing for a category as encoded JSON bytes"""
+        return self._entry(category)[2]
+
+    def briefing_json(self, category, date):
+        """A past day's briefing (from either tier) as encoded JSON bytes, or None"""
+        data = load_briefing(date, category, self.data_dir)
+        if data is None:
+            return None
+        return json.dumps(frontend_view(data)).encode()
+
+    def latest_json(self):
+        """Encoded JSON body for /api/latest (every category in one object)"""
+        entries = {category: self._entry(category) for category in CATEGORIES}
+        versions = tuple(entry[0] for entry in entries.values())
+        cached_versions, body = self._latest_body
+        if cached_versions == versions:
+            return body
+        body = json.dumps({category: entry[1] for category, entry in entries.items()}).encode()
+        self._latest_body = (versions, body)
+        return body
+
+
+# Shared cache used by both servers
+news_cache = NewsDataCache()
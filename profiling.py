@@ -0,0 +1,198 @@
+"""
+Request Profiling Hook
+
+Opt-in sampling profiler shared by server.py, simple_server.py and backend.py.
+Profiles are written as collapsed stacks ("frame;frame;frame count" per line),
+which flamegraph.pl, speedscope and inferno all read directly.
+
+Profiling is off by default. It can be turned on:
+- at startup with NEWS_PROFILE_RATE (fraction of requests to sample, 0.0-1.0)
+- per request with the X-Profile header, when it matches PROFILING_ADMIN_TOKEN
+- at runtime through the admin endpoint (/api/admin/profiling), which also
+  requires PROFILING_ADMIN_TOKEN
+
+At most NEWS_PROFILE_MAX profiles are kept in NEWS_PROFILE_DIR; after that,
+sampling stops until old profiles are removed. Requests that finish before the
+first sample (NEWS_PROFILE_INTERVAL) write no file.
+
+When disabled, the per-request cost is a couple of attribute checks.
+"""
+
+import os
+import sys
+import hmac
+import math
+import time
+import random
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+# Configuration
+PROFILE_DIR = os.environ.get('NEWS_PROFILE_DIR', 'profiles')
+PROFILE_RATE = float(os.environ.get('NEWS_PROFILE_RATE', '0') or 0)
+PROFILE_INTERVAL = float(os.environ.get('NEWS_PROFILE_INTERVAL', '0.001') or 0.001)
+PROFILE_MAX = int(os.environ.get('NEWS_PROFILE_MAX', '200') or 200)
+PROFILING_ADMIN_TOKEN = os.environ.get('PROFILING_ADMIN_TOKEN', '')
+
+
+class StackSampler:
+    """Sample the stack of one thread at a fixed interval from a helper thread"""
+
+    def __init__(self, thread_id, interval=PROFILE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            self.stacks[collapse_frame(frame)] += 1
+
+
+def collapse_frame(frame):
+    """Turn a frame and its parents into a root-first collapsed stack string"""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        module = os.path.splitext(os.path.basename(code.co_filename))[0]
+        names.append(f"{module}:{code.co_name}:{frame.f_lineno}")
+        frame = frame.f_back
+    names.reverse()
+    return ';'.join(names)
+
+
+def write_collapsed(stacks, path):
+    """Write a Counter of collapsed stacks in flamegraph input format"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w') as f:
+        for stack, count in stacks.most_common():
+            f.write(f"{stack} {count}\n")
+
+
+def finite(value, name):
+    """float(value), rejecting NaN and infinities (which min/max would silently clamp)"""
+    value = float(value)
+    if not math.isfinite(value):
+        raise ValueError(f"{name} must be a finite number")
+    return value
+
+
+class RequestProfiler:
+    """Decides which requests to profile and records their stacks"""
+
+    def __init__(self, sample_rate=PROFILE_RATE, output_dir=PROFILE_DIR,
+                 interval=PROFILE_INTERVAL, admin_token=PROFILING_ADMIN_TOKEN, max_profiles=PROFILE_MAX):
+        self.sample_rate = max(0.0, min(1.0, finite(sample_rate, 'sample_rate')))
+        self.output_dir = output_dir
+        self.interval = interval
+        self.admin_token = admin_token
+        self.max_profiles = max_profiles
+        self._lock = threading.Lock()
+        self._counter = 0
+        # Profiles in output_dir, counted on first use (None until then)
+        self._stored = None
+        self._counted = 0.0
+
+    @property
+    def enabled(self):
+        return self.sample_rate > 0
+
+    def is_admin(self, token):
+        """Check an admin token; admin access is disabled when no token is configured"""
+        return bool(self.admin_token) and bool(token) and hmac.compare_digest(str(token), self.admin_token)
+
+    def configure(self, sample_rate=None, interval=None):
+        """Update the sampling settings at runtime (used by the admin endpoint)"""
+        if sample_rate is not None:
+            self.sample_rate = max(0.0, min(1.0, finite(sample_rate, 'sample_rate')))
+        if interval is not None:
+            self.interval = max(0.0005, finite(interval, 'interval'))
+        return self.status()
+
+    def status(self):
+        return {
+            "enabled": self.enabled,
+            "sample_rate": self.sample_rate,
+            "interval": self.interval,
+            "output_dir": self.output_dir,
+            "profiles_written": self._counter,
+            "profiles_stored": self._stored,
+            "max_profiles": self.max_profiles,
+        }
+
+    def should_profile(self, headers=None):
+        """Return True if the current request should be profiled"""
+        if headers is not None and self.admin_token:
+            header = headers.get('X-Profile')
+            if header and self.is_admin(header):
+                return True
+        if not self.enabled or self.full():
+            return False
+        return self.sample_rate >= 1.0 or random.random() < self.sample_rate
+
+    def full(self):
+        """True once output_dir holds max_profiles profiles (recounted every few seconds while full)"""
+        now = time.monotonic()
+        if self._stored is None or (self._stored >= self.max_profiles and now - self._counted > 10):
+            try:
+                self._stored = sum(1 for name in os.listdir(self.output_dir) if name.endswith('.folded'))
+            except OSError:
+                self._stored = 0
+            self._counted = now
+        return self._stored >= self.max_profiles
+
+    def start(self, label):
+        """Start sampling the calling thread; returns a session for stop()"""
+        sampler = StackSampler(threading.get_ident(), self.interval)
+        sampler.start()
+        return (label, sampler, time.perf_counter())
+
+    def stop(self, session):
+        """Stop a session started with start() and write its collapsed stacks; returns the path or None"""
+        label, sampler, started = session
+        sampler.stop()
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if not sampler.stacks:
+            print(f"Profile for {label} ({elapsed_ms:.1f} ms) has no samples; nothing written")
+            return None
+        with self._lock:
+            if self.full():
+                print(f"Profile for {label} dropped: {self.output_dir} already holds {self.max_profiles} profiles")
+                return None
+            self._counter += 1
+            self._stored += 1
+            sequence = self._counter
+        safe_label = ''.join(c if c.isalnum() or c in '-_' else '_' for c in label.strip('/')) or 'root'
+        filename = f"{time.strftime('%Y%m%d-%H%M%S')}-{sequence:05d}-{safe_label}.folded"
+        path = os.path.join(self.output_dir, filename)
+        write_collapsed(sampler.stacks, path)
+        print(f"Profile for {label} ({elapsed_ms:.1f} ms, {sum(sampler.stacks.values())} samples) saved to {path}")
+        return path
+
+    @contextmanager
+    def profile(self, label, headers=None, force=False):
+        """Profile the body of the with-block if this call is selected"""
+        if not (force or self.should_profile(headers)):
+            yield None
+            return
+        session = self.start(label)
+        try:
+            yield session
+        finally:
+            self.stop(session)
+
+
+# Shared profiler used by both servers and the backend script
+profiler = RequestProfiler()
@@ -0,0 +1,212 @@
+"""
+Prompt Templates
+
+Every category prompt is built from two parts:
+- SYSTEM_PROMPT: the shared JSON schema, field definitions and rules. It is
+  identical for every category and always sent first, so the provider's
+  prompt cache can reuse it across calls.
+- a short per-category suffix (reader, allowed categories, rating scales),
+  sent as the user message.
+
+Run `python prompts.py` for a token-count report per category, or
+`python prompts.py --check` for a report of how many stored briefings match
+the schema the prompts ask for. test_prompts.py checks the recorded API
+fixtures against it.
+"""
+
+import sys
+
+from news_data import DATA_DIR, iter_briefings
+
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding('cl100k_base')
+except ImportError:
+    _ENCODING = None
+
+# Shared, stable prefix (keep this byte-for-byte identical across categories)
+SYSTEM_PROMPT = """You are a news analyst who finds, verifies and summarizes current news into a daily briefing.
+
+Return ONLY a valid JSON object with this structure:
+{
+  "weekly_top_story": STORY,
+  "stories": [STORY, ...]
+}
+where each STORY is:
+{"headline": "...", "summary": "...", "source": "...", "importance": 4, "impact_to_me": 3, "category": "...", "url": "https://..."}
+
+Fields:
+- "weekly_top_story": the single most important story from the last 7 days (NOT older)
+- "stories": 1-3 of the most significant stories from the LAST 24 HOURS ONLY (the daily section)
+- "headline": the original story headline
+- "summary": one concise sentence, with the focus given in the briefing request
+- "source": the name of the news source
+- "importance": integer 1-5, the story's significance, using the importance scale in the briefing request
+- "impact_to_me": integer 1-5, the story's relevance to the reader, using the impact scale in the briefing request
+- "category": exactly one word from the allowed list in the briefing request
+- "url": a REAL, VERIFIABLE URL to the original article (NOT a placeholder)
+
+Rules:
+1. Do NOT include news from before last week, even if it seems important.
+2. All URLs must be real, working links to articles published within these timeframes.
+3. Search for and verify current news stories; focus on genuinely recent developments.
+4. Output nothing but the JSON object."""
+
+# Per-category details appended after the shared prefix
+CATEGORY_PROFILES = {
+    'healthcare': {
+        'role': "an expert healthcare industry analyst",
+        'reader': "a busy healthcare professional",
+        'topic': "healthcare",
+        'summary_focus': "what happened and why it matters",
+        'categories': ["Policy", "Pharma", "Research", "Tech", "Business"],
+        'importance': [
+            "exceptional global significance (e.g., cure for major disease, breakthrough technology that will change everything)",
+            "major significance (e.g., important policy changes, significant scientific advancement)",
+            "moderate significance (e.g., notable industry developments, regional policy changes)",
+            "minor significance (e.g., company announcements, small regulatory changes)",
+            "minimal significance (e.g., minor updates, routine news)",
+        ],
+        'impact_audience': "a healthcare professional",
+        'impact': [
+            "direct and significant impact on practice/patients",
+            "important for professional development/awareness",
+            "moderate relevance to work",
+            "minor relevance or indirect impact",
+            "minimal professional relevance",
+        ],
+    },
+    'general': {
+        'role': "a world news synthesizer",
+        'reader': "a well-informed individual who wants to stay updated on major global developments "
+                  "but avoid day-to-day political drama",
+        'topic': "global news",
+        'summary_focus': "the event and its broader implications",
+        'categories': ["Technology", "Business", "Science", "Global", "Culture"],
+        'importance': [
+            "exceptional global significance (e.g., major geopolitical events, groundbreaking scientific discoveries)",
+            "major significance (e.g., important international agreements, significant technological advances)",
+            "moderate significance (e.g., notable economic shifts, regional developments)",
+            "minor significance (e.g., company news, local developments)",
+            "minimal significance (e.g., routine updates, minor announcements)",
+        ],
+        'impact_audience': "a typical person's life, finances, or worldview",
+        'impact': [
+            "direct and significant impact on daily life/finances",
+            "important for general awareness and planning",
+            "moderate relevance to personal life",
+            "minor relevance or indirect impact",
+            "minimal personal relevance",
+        ],
+    },
+}
+
+
+def build_category_prompt(category):
+    """Build the small per-category suffix sent after SYSTEM_PROMPT"""
+    return build_profile_prompt(CATEGORY_PROFILES[category])
+
+
+def build_profile_prompt(profile):
+    """Build the suffix for a profile shaped like CATEGORY_PROFILES' entries"""
+    importance = '\n'.join(f"{5 - i} - {text}" for i, text in enumerate(profile['importance']))
+    impact = '\n'.join(f"{5 - i} - {text}" for i, text in enumerate(profile['impact']))
+    categories = ', '.join(f'"{c}"' for c in profile['categories'])
+    return f"""Briefing request: {profile['topic']}
+Act as {profile['role']} writing for {profile['reader']}.
+Summary focus: {profile['summary_focus']}.
+Allowed categories: {categories}
+
+Importance scale (overall significance):
+{importance}
+
+Impact scale (impact on {profile['impact_audience']}):
+{impact}"""
+
+
+def build_messages(category, extra=''):
+    """Chat messages for a category: shared system prefix, then the category suffix"""
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": build_category_prompt(category) + extra},
+    ]
+
+
+def count_tokens(text):
+    """Token count with tiktoken when installed, else the ~4 characters per token rule"""
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text))
+    return max(1, len(text) // 4)
+
+
+def token_report():
+    """Per-category token counts for the shared prefix and the category suffix"""
+    shared = count_tokens(SYSTEM_PROMPT)
+    report = []
+    for category in CATEGORY_PROFILES:
+        suffix = count_tokens(build_category_prompt(category))
+        report.append({
+            "category": category,
+            "shared_prefix_tokens": shared,
+            "category_tokens": suffix,
+            "total_tokens": shared + suffix,
+        })
+    return report
+
+
+def validate_briefing(data, category):
+    """List the ways a parsed briefing breaks the schema the prompts ask for"""
+    problems = []
+    if not isinstance(data, dict):
+        return ["response is not a JSON object"]
+    allowed = CATEGORY_PROFILES[category]['categories']
+    stories = data.get('stories')
+    if not isinstance(stories, list) or not 1 <= len(stories) <= 3:
+        problems.append("'stories' must hold 1-3 stories")
+        stories = stories if isinstance(stories, list) else []
+    if not isinstance(data.get('weekly_top_story'), dict):
+        problems.append("missing 'weekly_top_story'")
+    entries = [('weekly_top_story', data.get('weekly_top_story'))]
+    entries += [(f'stories[{i}]', story) for i, story in enumerate(stories)]
+    for name, story in entries:
+        if not isinstance(story, dict):
+            continue
+        for field in ('headline', 'summary', 'source', 'url'):
+            if not isinstance(story.get(field), str) or not story[field].strip():
+                problems.append(f"{name}: missing '{field}'")
+        for field in ('importance', 'impact_to_me'):
+            if story.get(field) not in (1, 2, 3, 4, 5):
+                problems.append(f"{name}: '{field}' must be an integer from 1 to 5")
+        if story.get('category') not in allowed:
+            problems.append(f"{name}: category {story.get('category')!r} not in {allowed}")
+        if isinstance(story.get('url'), str) and not story['url'].startswith(('http://', 'https://')):
+            problems.append(f"{name}: url is not an http(s) link")
+    return problems
+
+
+def check_briefings(data_dir=DATA_DIR):
+    """Validate every stored briefing (both tiers); returns (checked, failing) counts"""
+    checked = failing = 0
+    for day, category, data in iter_briefings(data_dir):
+        if category not in CATEGORY_PROFILES:
+            continue
+        problems = validate_briefing(data, category)
+        checked += 1
+        if problems:
+            failing += 1
+            print(f"{day}-{category}: {'; '.join(problems)}")
+    return checked, failing
+
+
+if __name__ == "__main__":
+    if '--check' in sys.argv:
+        # A report on past output (written by older prompts), not a gate; see test_prompts.py
+        checked, failing = check_briefings()
+        print(f"{checked - failing}/{checked} briefings match the prompt schema")
+        sys.exit(0)
+
+    counter = "tiktoken cl100k_base" if _ENCODING is not None else "~4 chars/token estimate"
+    print(f"Prompt token report ({counter})")
+    for row in token_report():
+        print(f"{row['category']:>10}: {row['shared_prefix_tokens']} shared prefix + "
+              f"{row['category_tokens']} category = {row['total_tokens']} tokens")
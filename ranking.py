@@ -0,0 +1,328 @@
+"""
+Personalized Story Ranking
+
+At publish time every story from the recent briefings gets a feature vector
+(normalized importance and impact, novelty against earlier stories,
+weekly-top flag, one-hot briefing and story category) stored in
+data/features.json. Ranking for a batch of users is then a matrix product
+of the story features with the users' weight vectors, scaled by the user's
+preference for the story's briefing and a per-user recency decay:
+
+    score = (content features . weights) * feed weight * 0.5 ** (age_days / half_life_days)
+
+A feed weight of 0 hides that briefing entirely.
+
+A user profile looks like:
+
+    {"id": "aj",
+     "weights": {"importance": 1.0, "impact": 1.0, "novelty": 0.5, "weekly_top": 0.2},
+     "feeds": {"healthcare": 1.0, "general": 0.5},
+     "categories": {"Policy": 0.5, "Tech": 1.0},
+     "half_life_days": 2}
+
+Missing keys fall back to DEFAULT_PROFILE. Scoring uses NumPy when it is
+installed and plain Python otherwise.
+
+    python ranking.py --rebuild   # recompute data/features.json from data/
+"""
+
+import os
+import sys
+import json
+import math
+import threading
+from datetime import date, timedelta
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+from news_data import DATA_DIR, DATA_FILE_PATTERN, CATEGORIES, is_sample_briefing, headline_keywords, iter_briefings, store_lock
+from prompts import CATEGORY_PROFILES
+
+FEATURES_FILE = os.path.join(DATA_DIR, 'features.json')
+
+# Days of briefings that are ranked
+FEATURE_WINDOW_DAYS = 14
+# Days of earlier stories a new story is compared with for novelty
+NOVELTY_LOOKBACK_DAYS = 7
+# Signature similarity (Jaccard) at which two stories count as the same story
+DUPLICATE_THRESHOLD = 0.6
+# Bumped when the stored row layout changes
+STORE_VERSION = 2
+
+# Feature vector layout: scalar features, then one-hot briefing and story categories
+STORY_CATEGORIES = sorted({c for profile in CATEGORY_PROFILES.values() for c in profile['categories']})
+FEATURE_NAMES = (
+    ['importance', 'impact', 'novelty', 'weekly_top']
+    + [f"feed:{feed}" for feed in CATEGORIES]
+    + [f"category:{category}" for category in STORY_CATEGORIES]
+)
+# Columns of the one-hot briefing (feed) features
+FEED_COLUMNS = [FEATURE_NAMES.index(f"feed:{feed}") for feed in CATEGORIES]
+CONTENT_COLUMNS = [i for i in range(len(FEATURE_NAMES)) if i not in FEED_COLUMNS]
+
+DEFAULT_PROFILE = {
+    "weights": {"importance": 1.0, "impact": 1.0, "novelty": 0.5, "weekly_top": 0.0},
+    "feeds": {feed: 1.0 for feed in CATEGORIES},
+    "categories": {},
+    "half_life_days": 2.0,
+}
+
+
+def jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def story_vector(story, feed, weekly, novelty):
+    """Feature vector for one story, laid out as FEATURE_NAMES"""
+    def rating(value):
+        return (value - 1) / 4.0 if isinstance(value, int) and 1 <= value <= 5 else 0.5
+
+    vector = [rating(story.get('importance')), rating(story.get('impact_to_me')), novelty, 1.0 if weekly else 0.0]
+    vector += [1.0 if feed == f else 0.0 for f in CATEGORIES]
+    vector += [1.0 if story.get('category') == c else 0.0 for c in STORY_CATEGORIES]
+    return vector
+
+
+class FeatureStore:
+    """Story rows with precomputed feature vectors, persisted to one JSON file
+
+    Rows keep the raw story fields. Novelty, duplicates and vectors are
+    recomputed over the whole store in date order on every change, so the
+    result does not depend on the order briefings are recorded in.
+    """
+
+    def __init__(self, path=FEATURES_FILE):
+        self.path = path
+        self.stories = []
+        # True when the file was written with another layout or feature set and needs a rebuild
+        self.stale = False
+        if path and os.path.exists(path):
+            with open(path, 'r') as f:
+                state = json.load(f)
+            if state.get('features') == FEATURE_NAMES and state.get('version') == STORE_VERSION:
+                self.stories = state.get('stories', [])
+            else:
+                self.stale = True
+
+    def record(self, day, feed, data):
+        """Add (or replace) the stories of one published briefing"""
+        self.stories = [s for s in self.stories if not (s['date'] == day and s['feed'] == feed)]
+        if not is_sample_briefing(data):
+            entries = [(data.get('weekly_top_story'), True)] + [(s, False) for s in data.get('stories') or []]
+            for index, (story, weekly) in enumerate(entries):
+                if not isinstance(story, dict) or not story.get('headline'):
+                    continue
+                self.stories.append({
+                    "id": f"{day}:{feed}:{index}",
+                    "date": day,
+                    "feed": feed,
+                    "index": index,
+                    "weekly_top": weekly,
+                    "headline": story.get('headline'),
+                    "summary": story.get('summary'),
+                    "source": story.get('source'),
+                    "category": story.get('category'),
+                    "url": story.get('url'),
+                    "importance": story.get('importance'),
+                    "impact_to_me": story.get('impact_to_me'),
+                    "signature": sorted(headline_keywords(str(story['headline']))),
+                })
+
+        # Keep the ranked window plus the lookback its oldest day is compared with
+        if self.stories:
+            newest = max(s['date'] for s in self.stories)
+            keep_start = (date.fromisoformat(newest)
+                          - timedelta(days=FEATURE_WINDOW_DAYS + NOVELTY_LOOKBACK_DAYS - 1)).isoformat()
+            self.stories = [s for s in self.stories if s['date'] >= keep_start]
+
+    def score(self):
+        """Recompute novelty, duplicates and vectors for every row, oldest first"""
+        self.stories.sort(key=lambda s: (s['date'], s['feed'], s['index']))
+        signatures = [set(s['signature']) for s in self.stories]
+        for story in self.stories:
+            story['duplicate_of'] = None
+        for i, story in enumerate(self.stories):
+            lookback_start = (date.fromisoformat(story['date']) - timedelta(days=NOVELTY_LOOKBACK_DAYS)).isoformat()
+            novelty = 1.0
+            for j, other in enumerate(self.stories[:i]):
+                if not lookback_start <= other['date'] < story['date']:
+                    continue
+                similarity = 1.0 if story['url'] and story['url'] == other['url'] \
+                    else jaccard(signatures[i], signatures[j])
+                novelty = min(novelty, 1.0 - similarity)
+                # Keep only the newest copy of a repeated story
+                if similarity >= DUPLICATE_THRESHOLD:
+                    other['duplicate_of'] = story['id']
+            story['vector'] = story_vector(story, story['feed'], story['weekly_top'], round(novelty, 4))
+
+    def save(self):
+        self.score()
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            state = {"version": STORE_VERSION, "features": FEATURE_NAMES, "stories": self.stories}
+            f.write(json.dumps(state, separators=(',', ':')))
+        os.replace(tmp_path, self.path)
+
+
+def record_briefing(day, feed, data, path=FEATURES_FILE):
+    """Update the feature store after backend.py publishes a briefing"""
+    # File lock: the daily job, backfills and tenant builds may run at once
+    with store_lock(path):
+        store = FeatureStore(path)
+        if store.stale or not os.path.exists(path):
+            # Recording into an empty store would drop every other briefing
+            print(f"{path} missing or outdated, rebuilding it from the briefing files")
+            store = _rebuild(os.path.dirname(path) or '.', path)
+        store.record(day, feed, data)
+        store.save()
+
+
+def rebuild(data_dir=DATA_DIR, path=FEATURES_FILE):
+    """Recompute the feature store from the last FEATURE_WINDOW_DAYS of briefings"""
+    with store_lock(path):
+        return _rebuild(data_dir, path)
+
+
+def _rebuild(data_dir, path):
+    store = FeatureStore(None)
+    store.path = path
+    days = [m.group(1) for m in map(DATA_FILE_PATTERN.match, os.listdir(data_dir)) if m and m.group(2) in CATEGORIES]
+    if days:
+        # The same span record() keeps: the ranked window plus its novelty lookback
+        newest = date.fromisoformat(max(days))
+        start = (newest - timedelta(days=FEATURE_WINDOW_DAYS + NOVELTY_LOOKBACK_DAYS - 1)).isoformat()
+        for day, feed, data in iter_briefings(data_dir, since=start):
+            if feed in CATEGORIES:
+                store.record(day, feed, data)
+    store.save()
+    return store
+
+
+def user_weights(profile):
+    """Weight vector for a user profile, laid out as FEATURE_NAMES"""
+    weights = dict(DEFAULT_PROFILE['weights'], **(profile.get('weights') or {}))
+    feeds = dict(DEFAULT_PROFILE['feeds'], **(profile.get('feeds') or {}))
+    categories = profile.get('categories') or {}
+    vector = [float(weights.get(name, 0.0)) for name in ('importance', 'impact', 'novelty', 'weekly_top')]
+    vector += [float(feeds.get(feed, 0.0)) for feed in CATEGORIES]
+    vector += [float(categories.get(category, 0.0)) for category in STORY_CATEGORIES]
+    return vector
+
+
+class Ranker:
+    """Ranks the feature store's stories for batches of users"""
+
+    def __init__(self, stories):
+        # Only the last FEATURE_WINDOW_DAYS are ranked; the older rows are novelty context.
+        # Superseded copies of repeated stories are never ranked.
+        newest = max((s['date'] for s in stories), default=None)
+        window_start = (date.fromisoformat(newest) - timedelta(days=FEATURE_WINDOW_DAYS - 1)).isoformat() if newest else ''
+        self.stories = [s for s in stories if s['date'] >= window_start and not s.get('duplicate_of')]
+        self.ordinals = [date.fromisoformat(s['date']).toordinal() for s in self.stories]
+        if NUMPY_AVAILABLE:
+            self.matrix = np.array([s['vector'] for s in self.stories], dtype=float).reshape(-1, len(FEATURE_NAMES))
+            self.ordinal_array = np.array(self.ordinals, dtype=float)
+
+    def rank(self, profiles, limit=5, as_of=None):
+        """Top `limit` stories for each profile; returns {user id: [story, ...]}"""
+        if not self.stories or not profiles:
+            return {str(p.get('id', i)): [] for i, p in enumerate(profiles)}
+        as_of = date.fromisoformat(as_of).toordinal() if as_of else max(self.ordinals)
+        ids = [str(p.get('id', i)) for i, p in enumerate(profiles)]
+        half_lives = [max(float(p.get('half_life_days') or DEFAULT_PROFILE['half_life_days']), 0.01) for p in profiles]
+
+        if NUMPY_AVAILABLE:
+            weights = np.array([user_weights(p) for p in profiles], dtype=float)
+            ages = np.maximum(as_of - self.ordinal_array, 0.0)
+            decay = np.exp2(-ages[:, None] / np.array(half_lives)[None, :])
+            content = self.matrix[:, CONTENT_COLUMNS] @ weights[:, CONTENT_COLUMNS].T
+            feed = self.matrix[:, FEED_COLUMNS] @ weights[:, FEED_COLUMNS].T
+            scores = content * feed * decay
+            k = min(limit, len(self.stories))
+            results = {}
+            for column, user_id in enumerate(ids):
+                top = np.argpartition(-scores[:, column], k - 1)[:k]
+                top = top[np.argsort(-scores[top, column], kind='stable')]
+                results[user_id] = [self._result(i, scores[i, column]) for i in top if scores[i, column] > 0]
+            return results
+
+        results = {}
+        for profile, user_id, half_life in zip(profiles, ids, half_lives):
+            weights = user_weights(profile)
+            scored = []
+            for i, story in enumerate(self.stories):
+                age = max(as_of - self.ordinals[i], 0)
+                content = sum(story['vector'][c] * weights[c] for c in CONTENT_COLUMNS)
+                feed = sum(story['vector'][c] * weights[c] for c in FEED_COLUMNS)
+                score = content * feed * math.pow(2, -age / half_life)
+                scored.append((score, i))
+            scored.sort(key=lambda pair: -pair[0])
+            results[user_id] = [self._result(i, score) for score, i in scored[:limit] if score > 0]
+        return results
+
+    def _result(self, index, score):
+        story = self.stories[index]
+        result = {key: story[key] for key in ('id', 'date', 'feed', 'headline', 'summary', 'source', 'category', 'url')}
+        result['score'] = round(float(score), 4)
+        return result
+
+
+class RankerCache:
+    """A Ranker over the feature store, rebuilt only when the file changes"""
+
+    def __init__(self, path=FEATURES_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._version = None
+        self._ranker = None
+
+    def get(self):
+        with self._lock:
+            try:
+                stat = os.stat(self.path)
+                version = (stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                version = None
+            if self._ranker is not None and version == self._version:
+                return self._ranker
+            store = FeatureStore(self.path) if version is not None else None
+            if store is None or store.stale:
+                # Missing, or written with another feature layout: build it from the data files
+                print(f"{self.path} missing or outdated, rebuilding story features from {os.path.dirname(self.path) or '.'}")
+                store = rebuild(os.path.dirname(self.path) or '.', self.path)
+                stat = os.stat(self.path)
+                version = (stat.st_mtime_ns, stat.st_size)
+            stories = store.stories
+            self._ranker = Ranker(stories)
+            self._version = version
+            return self._ranker
+
+
+# Shared cache used by both servers
+ranker_cache = RankerCache()
+
+
+def rank_request(payload):
+    """Handle an /api/rank body: {"users": [profile, ...], "limit": 5, "as_of": "YYYY-MM-DD"}"""
+    if not isinstance(payload, dict):
+        raise ValueError("request body must be a JSON object")
+    users = payload.get('users') or [payload.get('user') or {"id": "default"}]
+    if not isinstance(users, list) or not all(isinstance(u, dict) for u in users):
+        raise ValueError("'users' must be a list of profile objects")
+    limit = max(1, min(int(payload.get('limit', 5)), 50))
+    return {"rankings": ranker_cache.get().rank(users, limit=limit, as_of=payload.get('as_of'))}
+
+
+if __name__ == "__main__":
+    if '--rebuild' in sys.argv:
+        store = rebuild()
+        print(f"Rebuilt {len(store.stories)} story feature vectors into {FEATURES_FILE}")
+    ranker = Ranker(FeatureStore().stories)
+    for story in ranker.rank([{"id": "default"}], limit=5)["default"]:
+        print(f"{story['score']:>6.3f}  {story['date']} {story['feed']:<10} {story['headline']}")
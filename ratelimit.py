@@ -0,0 +1,232 @@
+"""
+Upstream Rate Limiter and Budget Manager
+
+Shared throttle for Perplexity API calls. It enforces:
+- requests per minute (token bucket)
+- tokens per minute (token bucket, estimated before the call and corrected
+  from the response `usage` field afterwards)
+- a daily spend budget in USD, tracked from `usage`. acquire() reserves the
+  estimated cost of each call, so calls still in flight count against the
+  budget; record() swaps the reservation for the actual cost
+
+State lives in a small SQLite file, so every process on the machine (the daily
+run, backfills, tenant builds) draws from the same buckets. Callers block in
+acquire() until capacity is available instead of failing; only an exhausted
+daily budget raises.
+
+Configuration (environment variables):
+- PERPLEXITY_RPM            requests per minute (default 50)
+- PERPLEXITY_TPM            tokens per minute (default 100000)
+- PERPLEXITY_DAILY_BUDGET   daily spend ceiling in USD (default: unlimited)
+- PERPLEXITY_RATELIMIT_DB   SQLite state file (default .ratelimit.sqlite)
+- PERPLEXITY_INPUT_PRICE / PERPLEXITY_OUTPUT_PRICE   USD per 1M tokens, used
+  when the response carries no cost (default 1.0 / 1.0)
+- PERPLEXITY_REQUEST_PRICE  USD per request (default 0.005)
+"""
+
+import os
+import time
+import sqlite3
+from contextlib import closing
+from datetime import datetime, timezone
+
+
+class BudgetExceededError(Exception):
+    """Raised when a call would go over the daily spend budget"""
+
+
+class UpstreamLimiter:
+    """Cross-process token buckets for requests and tokens, plus a daily budget"""
+
+    # Longest single sleep while waiting, so budget/pause changes are noticed
+    MAX_WAIT = 5.0
+    # Reservations older than this belong to a crashed caller and stop counting
+    RESERVATION_TTL = 600.0
+
+    def __init__(self, db_path='.ratelimit.sqlite', rpm=50, tpm=100000, daily_budget=None,
+                 input_price=1.0, output_price=1.0, request_price=0.005, expected_completion_tokens=1000):
+        self.db_path = db_path
+        self.rpm = float(rpm)
+        self.tpm = float(tpm)
+        self.daily_budget = daily_budget
+        self.input_price = input_price
+        self.output_price = output_price
+        self.request_price = request_price
+        self.expected_completion_tokens = expected_completion_tokens
+        self._init_db()
+
+    @classmethod
+    def from_env(cls):
+        budget = os.environ.get('PERPLEXITY_DAILY_BUDGET')
+        return cls(
+            db_path=os.environ.get('PERPLEXITY_RATELIMIT_DB', '.ratelimit.sqlite'),
+            rpm=float(os.environ.get('PERPLEXITY_RPM', '50')),
+            tpm=float(os.environ.get('PERPLEXITY_TPM', '100000')),
+            daily_budget=float(budget) if budget else None,
+            input_price=float(os.environ.get('PERPLEXITY_INPUT_PRICE', '1.0')),
+            output_price=float(os.environ.get('PERPLEXITY_OUTPUT_PRICE', '1.0')),
+            request_price=float(os.environ.get('PERPLEXITY_REQUEST_PRICE', '0.005')),
+        )
+
+    def _connect(self):
+        # isolation_level=None lets us issue BEGIN IMMEDIATE ourselves
+        return sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+
+    def _init_db(self):
+        with closing(self._connect()) as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS buckets (name TEXT PRIMARY KEY, level REAL, updated REAL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS pause (id INTEGER PRIMARY KEY CHECK (id = 0), until REAL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS spend (day TEXT PRIMARY KEY, usd REAL, requests INTEGER, "
+                         "prompt_tokens INTEGER, completion_tokens INTEGER)")
+            conn.execute("CREATE TABLE IF NOT EXISTS reservations (id INTEGER PRIMARY KEY, day TEXT, usd REAL, created REAL)")
+
+    @staticmethod
+    def today():
+        return datetime.now(timezone.utc).strftime('%Y-%m-%d')
+
+    def estimate_tokens(self, *texts):
+        """Rough token count for a request: ~4 characters per token plus the expected reply"""
+        return sum(len(t) for t in texts) // 4 + self.expected_completion_tokens
+
+    def estimate_cost(self, prompt_tokens, completion_tokens):
+        return (prompt_tokens * self.input_price + completion_tokens * self.output_price) / 1e6 + self.request_price
+
+    def _bucket(self, conn, name, capacity, now):
+        """Current level of a bucket after refilling for the elapsed time"""
+        row = conn.execute("SELECT level, updated FROM buckets WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            return capacity
+        level, updated = row
+        return min(capacity, level + (now - updated) * capacity / 60.0)
+
+    def _set_bucket(self, conn, name, level, now):
+        conn.execute("INSERT OR REPLACE INTO buckets (name, level, updated) VALUES (?, ?, ?)", (name, level, now))
+
+    def spent_today(self):
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT usd FROM spend WHERE day = ?", (self.today(),)).fetchone()
+        return row[0] if row else 0.0
+
+    def acquire(self, tokens):
+        """Block until one request and `tokens` tokens are available, then take them
+
+        With a daily budget, the call's estimated cost is reserved too; pass the
+        returned reservation to record() or release().
+        """
+        # A single request larger than the whole bucket could never run
+        tokens = min(tokens, self.tpm)
+        while True:
+            conn = self._connect()
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                now = time.time()
+                row = conn.execute("SELECT until FROM pause WHERE id = 0").fetchone()
+                paused_for = (row[0] - now) if row else 0
+
+                if self.daily_budget is not None:
+                    today = self.today()
+                    row = conn.execute("SELECT usd FROM spend WHERE day = ?", (today,)).fetchone()
+                    spent = row[0] if row else 0.0
+                    conn.execute("DELETE FROM reservations WHERE created < ?", (now - self.RESERVATION_TTL,))
+                    in_flight = conn.execute("SELECT COALESCE(SUM(usd), 0) FROM reservations WHERE day = ?",
+                                             (today,)).fetchone()[0]
+                    expected_cost = self.estimate_cost(max(tokens - self.expected_completion_tokens, 0),
+                                                       self.expected_completion_tokens)
+                    if spent + in_flight + expected_cost > self.daily_budget:
+                        conn.execute("ROLLBACK")
+                        raise BudgetExceededError(
+                            f"Daily budget ${self.daily_budget:.2f} reached "
+                            f"(spent ${spent:.4f} today, ${in_flight:.4f} in flight)")
+
+                requests_left = self._bucket(conn, 'requests', self.rpm, now)
+                tokens_left = self._bucket(conn, 'tokens', self.tpm, now)
+                if paused_for <= 0 and requests_left >= 1 and tokens_left >= tokens:
+                    self._set_bucket(conn, 'requests', requests_left - 1, now)
+                    self._set_bucket(conn, 'tokens', tokens_left - tokens, now)
+                    reservation = None
+                    if self.daily_budget is not None:
+                        reservation = conn.execute("INSERT INTO reservations (day, usd, created) VALUES (?, ?, ?)",
+                                                   (today, expected_cost, now)).lastrowid
+                    conn.execute("COMMIT")
+                    return reservation
+
+                conn.execute("ROLLBACK")
+                wait = max(
+                    paused_for,
+                    (1 - requests_left) * 60.0 / self.rpm,
+                    (tokens - tokens_left) * 60.0 / self.tpm,
+                )
+            finally:
+                conn.close()
+            time.sleep(min(max(wait, 0.01), self.MAX_WAIT))
+
+    def release(self, reservation):
+        """Drop the cost reservation of a call that never completed (error, 429)"""
+        if reservation is None:
+            return
+        with closing(self._connect()) as conn:
+            conn.execute("DELETE FROM reservations WHERE id = ?", (reservation,))
+
+    def record(self, usage, estimated_tokens, reservation=None):
+        """Account for a finished call using the response `usage` field"""
+        usage = usage or {}
+        prompt_tokens = int(usage.get('prompt_tokens', 0))
+        completion_tokens = int(usage.get('completion_tokens', 0))
+        actual_tokens = int(usage.get('total_tokens', prompt_tokens + completion_tokens)) or estimated_tokens
+        cost = (usage.get('cost') or {}).get('total_cost')
+        if cost is None:
+            cost = self.estimate_cost(prompt_tokens, completion_tokens)
+
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            now = time.time()
+            # Give back (or take more of) the estimate now that we know the real count
+            tokens_left = self._bucket(conn, 'tokens', self.tpm, now)
+            self._set_bucket(conn, 'tokens', tokens_left + estimated_tokens - actual_tokens, now)
+            # The reserved estimate becomes the actual cost in the same transaction
+            if reservation is not None:
+                conn.execute("DELETE FROM reservations WHERE id = ?", (reservation,))
+            conn.execute(
+                "INSERT INTO spend (day, usd, requests, prompt_tokens, completion_tokens) VALUES (?, ?, 1, ?, ?) "
+                "ON CONFLICT(day) DO UPDATE SET usd = usd + excluded.usd, requests = requests + 1, "
+                "prompt_tokens = prompt_tokens + excluded.prompt_tokens, "
+                "completion_tokens = completion_tokens + excluded.completion_tokens",
+                (self.today(), cost, prompt_tokens, completion_tokens)
+            )
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+        return cost
+
+    def pause(self, seconds):
+        """Hold every caller (in every process) for `seconds`, e.g. after a 429"""
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            until = time.time() + seconds
+            row = conn.execute("SELECT until FROM pause WHERE id = 0").fetchone()
+            if row is None or row[0] < until:
+                conn.execute("INSERT OR REPLACE INTO pause (id, until) VALUES (0, ?)", (until,))
+            # Drain the request bucket so callers resume gradually, not all at once
+            self._set_bucket(conn, 'requests', 0, until)
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+    def usage_report(self, days=7):
+        """Spend per day for the most recent `days` days"""
+        with closing(self._connect()) as conn:
+            rows = conn.execute("SELECT day, usd, requests, prompt_tokens, completion_tokens FROM spend "
+                                "ORDER BY day DESC LIMIT ?", (days,)).fetchall()
+        return [
+            {"day": d, "usd": round(u, 4), "requests": r, "prompt_tokens": p, "completion_tokens": c}
+            for d, u, r, p, c in rows
+        ]
+
+
+if __name__ == "__main__":
+    limiter = UpstreamLimiter.from_env()
+    for row in limiter.usage_report():
+        print(f"{row['day']}: ${row['usd']:.4f} over {row['requests']} requests "
+              f"({row['prompt_tokens']} prompt / {row['completion_tokens']} completion tokens)")
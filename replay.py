@@ -0,0 +1,429 @@
+"""
+Perplexity API Record / Replay
+
+Runs backend.py and test_api.py without the live API. Both read
+PERPLEXITY_API_BASE, so they can be pointed at a local proxy or stub:
+
+    # record real exchanges through a forwarding proxy
+    python replay.py record --port 8010
+    PERPLEXITY_API_BASE=http://127.0.0.1:8010 python backend.py
+
+    # replay them from a stub, optionally with latency, errors and 429s
+    python replay.py serve --port 8010 --speed 1 --error-rate 0.1 --rpm 10
+    PERPLEXITY_API_BASE=http://127.0.0.1:8010 PERPLEXITY_API_KEY=replay python backend.py
+
+    # make a fixture from a stored briefing
+    python replay.py fixture data/2026-02-17-healthcare.json
+
+    # run backend.main() against the stub in a temporary directory
+    python replay.py pipeline
+
+Fixtures are JSON files in fixtures/perplexity/. Each holds the request
+body, the response status, headers and body, the streamed chunks with their
+arrival times (for "stream": true requests), and the measured latency. The
+Authorization header is never stored. A request is answered by the fixture
+with the same key (hash of the request body) or, failing that, the first
+fixture whose "match" text appears in the last message.
+
+Replayed latency is the recorded latency times --speed (default 0: answer
+immediately), plus --delay seconds.
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import random
+import codecs
+import hashlib
+import argparse
+import tempfile
+import threading
+import http.server
+from collections import deque
+from datetime import datetime
+
+FIXTURES_DIR = os.path.join('fixtures', 'perplexity')
+UPSTREAM = 'https://api.perplexity.ai'
+
+# Response headers kept in fixtures and replayed
+KEPT_HEADERS = ('Content-Type', 'Retry-After')
+
+
+def request_key(body):
+    """Stable key for a request body; streamed and whole responses share a fixture"""
+    if isinstance(body, dict):
+        body = {k: v for k, v in body.items() if k != 'stream'}
+    return hashlib.sha256(json.dumps(body, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def load_fixtures(directory=FIXTURES_DIR):
+    fixtures = []
+    if os.path.isdir(directory):
+        for name in sorted(os.listdir(directory)):
+            if name.endswith('.json'):
+                with open(os.path.join(directory, name), 'r') as f:
+                    fixtures.append(json.load(f))
+    return fixtures
+
+
+def save_fixture(fixture, directory=FIXTURES_DIR, name=None):
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, name or f"{fixture['key']}.json")
+    with open(path, 'w') as f:
+        json.dump(fixture, f, indent=2)
+    return path
+
+
+def find_fixture(fixtures, body):
+    """The fixture that answers a request body, or None"""
+    key = request_key(body)
+    for fixture in fixtures:
+        if fixture['key'] == key:
+            return fixture
+    messages = body.get('messages') if isinstance(body, dict) else None
+    last = str(messages[-1].get('content', '')) if messages and isinstance(messages[-1], dict) else ''
+    for fixture in fixtures:
+        if fixture.get('match') and fixture['match'] in last:
+            return fixture
+    return None
+
+
+def fixture_content(fixture):
+    """The assistant message content a fixture's response carries"""
+    body = fixture['response']['body']
+    if isinstance(body, dict):
+        return body['choices'][0]['message']['content']
+    # A recorded stream: join the content deltas of its server-sent events
+    parts = []
+    for line in str(body).splitlines():
+        if line.startswith('data: ') and line != 'data: [DONE]':
+            for choice in json.loads(line[6:]).get('choices', []):
+                parts.append((choice.get('delta') or {}).get('content') or '')
+    return ''.join(parts)
+
+
+def sse_chunks(content, pieces=8, total=0.0, first_byte=0.0):
+    """Split a completion into server-sent event chunks spread over [first_byte, total]"""
+    size = max(1, math.ceil(len(content) / pieces))
+    parts = [content[i:i + size] for i in range(0, len(content), size)]
+    step = (total - first_byte) / max(len(parts), 1)
+    chunks = []
+    for i, part in enumerate(parts):
+        event = {"choices": [{"index": 0, "delta": {"content": part}}]}
+        chunks.append([round(first_byte + i * step, 4), f"data: {json.dumps(event)}\n\n"])
+    chunks.append([round(total, 4), "data: [DONE]\n\n"])
+    return chunks
+
+
+def fixture_from_briefing(filename, category=None, latency=0.0):
+    """A fixture that answers a category's request with a stored briefing"""
+    import backend
+    from prompts import CATEGORY_PROFILES, count_tokens
+
+    category = category or os.path.basename(filename)[:-len('.json')].rsplit('-', 1)[-1]
+    with open(filename, 'r') as f:
+        briefing = json.load(f)
+    body = backend.build_request(backend.CATEGORY_PROMPTS[category])
+    key = request_key(body)
+    content = json.dumps(briefing, indent=2)
+    prompt_tokens = sum(count_tokens(m['content']) for m in body['messages'])
+    completion_tokens = count_tokens(content)
+    return {
+        "key": key,
+        "source": f"built from {filename}",
+        "recorded": datetime.now().isoformat(timespec='seconds'),
+        "match": f"Briefing request: {CATEGORY_PROFILES[category]['topic']}\n",
+        "request": {"path": "/chat/completions", "body": body},
+        "response": {
+            "status": 200,
+            "headers": {"Content-Type": "application/json"},
+            "body": {
+                "id": f"fixture-{key}",
+                "object": "chat.completion",
+                "model": body['model'],
+                "created": int(time.time()),
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": content}}],
+                "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                          "total_tokens": prompt_tokens + completion_tokens},
+            },
+            "chunks": sse_chunks(content, total=latency, first_byte=latency / 4),
+        },
+        "latency": {"first_byte": round(latency / 4, 4), "total": latency},
+    }
+
+
+class ReplayServer(http.server.ThreadingHTTPServer):
+    """Stub API answering from fixtures, with injectable latency, errors and rate limits"""
+
+    daemon_threads = True
+
+    def __init__(self, server_address, fixtures, speed=0.0, delay=0.0, error_rate=0.0,
+                 rpm=None, retry_after=None, seed=0, quiet=False):
+        super().__init__(server_address, ReplayHandler)
+        self.fixtures = fixtures
+        self.speed = speed
+        self.delay = delay
+        self.error_rate = error_rate
+        self.rpm = rpm
+        self.retry_after = retry_after
+        self.quiet = quiet
+        self.rng = random.Random(seed)
+        self.recent = deque()
+        self.lock = threading.Lock()
+
+    def admit(self):
+        """(status, retry_after) for the next request: 200, 429 over --rpm, or an injected 500"""
+        with self.lock:
+            if self.rpm:
+                now = time.monotonic()
+                while self.recent and now - self.recent[0] >= 60:
+                    self.recent.popleft()
+                if len(self.recent) >= self.rpm:
+                    wait = self.retry_after if self.retry_after is not None else 60 - (now - self.recent[0])
+                    return 429, max(0, math.ceil(wait))
+                self.recent.append(now)
+            if self.error_rate and self.rng.random() < self.error_rate:
+                return 500, None
+        return 200, None
+
+
+class ExchangeHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+    def read_body(self):
+        raw = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        try:
+            return raw, json.loads(raw or b'null')
+        except ValueError:
+            return raw, None
+
+    def send_json(self, status, data, headers=None):
+        body = data.encode() if isinstance(data, str) else json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class ReplayHandler(ExchangeHandler):
+    def do_POST(self):
+        _, body = self.read_body()
+        status, retry_after = self.server.admit()
+        if status == 429:
+            self.send_json(429, {"error": {"message": "rate limit exceeded (replay stub)"}},
+                           {'Retry-After': str(retry_after)})
+            return
+        if status == 500:
+            self.send_json(500, {"error": {"message": "injected error (replay stub)"}})
+            return
+        fixture = find_fixture(self.server.fixtures, body)
+        if fixture is None:
+            self.send_json(404, {"error": {"message": "no fixture matches this request"}})
+            return
+
+        if self.server.delay:
+            time.sleep(self.server.delay)
+        response = fixture['response']
+        latency = fixture.get('latency') or {}
+        speed = self.server.speed
+        if isinstance(body, dict) and body.get('stream') and response.get('chunks'):
+            self.send_response(response['status'])
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Connection', 'close')
+            self.end_headers()
+            started = time.monotonic()
+            for offset, chunk in response['chunks']:
+                wait = offset * speed - (time.monotonic() - started)
+                if wait > 0:
+                    time.sleep(wait)
+                self.wfile.write(chunk.encode())
+                self.wfile.flush()
+            self.close_connection = True
+            return
+        if speed and latency.get('total'):
+            time.sleep(latency['total'] * speed)
+        headers = {k: v for k, v in (response.get('headers') or {}).items() if k != 'Content-Type'}
+        self.send_json(response['status'], response['body'], headers)
+
+
+class RecordServer(http.server.ThreadingHTTPServer):
+    """Forwarding proxy that saves every successful exchange as a fixture"""
+
+    daemon_threads = True
+
+    def __init__(self, server_address, upstream=UPSTREAM, fixtures_dir=FIXTURES_DIR, quiet=False):
+        super().__init__(server_address, RecordHandler)
+        self.upstream = upstream.rstrip('/')
+        self.fixtures_dir = fixtures_dir
+        self.quiet = quiet
+
+
+class RecordHandler(ExchangeHandler):
+    def do_POST(self):
+        import requests
+
+        raw, body = self.read_body()
+        headers = {k: v for k, v in self.headers.items() if k.lower() in ('authorization', 'content-type', 'accept')}
+        started = time.monotonic()
+        try:
+            upstream = requests.post(self.server.upstream + self.path, data=raw, headers=headers,
+                                     stream=True, timeout=300)
+        except requests.RequestException as e:
+            self.send_json(502, {"error": {"message": f"upstream request failed: {e}"}})
+            return
+
+        self.send_response(upstream.status_code)
+        for name in KEPT_HEADERS:
+            if name in upstream.headers:
+                self.send_header(name, upstream.headers[name])
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        decoder = codecs.getincrementaldecoder('utf-8')('replace')
+        chunks, first_byte = [], None
+        for chunk in upstream.iter_content(chunk_size=None):
+            offset = time.monotonic() - started
+            first_byte = offset if first_byte is None else first_byte
+            chunks.append([round(offset, 4), decoder.decode(chunk)])
+            self.wfile.write(chunk)
+            self.wfile.flush()
+        total = time.monotonic() - started
+        self.close_connection = True
+
+        # Failures are injected by the stub instead of replayed
+        if upstream.status_code >= 400:
+            return
+        text = ''.join(c for _, c in chunks) + decoder.decode(b'', final=True)
+        try:
+            response_body = json.loads(text)
+        except ValueError:
+            response_body = text
+        stream = isinstance(body, dict) and bool(body.get('stream'))
+        fixture = {
+            "key": request_key(body),
+            "source": f"recorded from {self.server.upstream}",
+            "recorded": datetime.now().isoformat(timespec='seconds'),
+            "request": {"path": self.path, "body": body},
+            "response": {
+                "status": upstream.status_code,
+                "headers": {k: upstream.headers[k] for k in KEPT_HEADERS if k in upstream.headers},
+                "body": response_body,
+                "chunks": chunks if stream else None,
+            },
+            "latency": {"first_byte": round(first_byte or total, 4), "total": round(total, 4)},
+        }
+        print(f"Recorded {save_fixture(fixture, self.server.fixtures_dir)} ({total:.2f}s)")
+
+
+def start_in_thread(server):
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return f"http://{server.server_address[0]}:{server.server_address[1]}"
+
+
+def run_pipeline(fixtures_dir=FIXTURES_DIR, **stub_options):
+    """Run backend.main() against a replay stub in a temporary directory.
+
+    Returns (seconds, {category: True if a real briefing was written}).
+    """
+    import backend
+    from ratelimit import UpstreamLimiter
+    from news_data import is_sample_briefing
+
+    server = ReplayServer(('127.0.0.1', 0), load_fixtures(fixtures_dir), quiet=True, **stub_options)
+    base_url = start_in_thread(server)
+    saved = (backend.PERPLEXITY_API_BASE, backend.PERPLEXITY_API_KEY, backend.limiter)
+    cwd = os.getcwd()
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            os.chdir(workdir)
+            os.makedirs('data')
+            backend.PERPLEXITY_API_BASE = base_url
+            backend.PERPLEXITY_API_KEY = 'replay'
+            backend.limiter = UpstreamLimiter(db_path=os.path.join(workdir, 'ratelimit.sqlite'))
+            started = time.perf_counter()
+            backend.main()
+            elapsed = time.perf_counter() - started
+            today = datetime.now().strftime('%Y-%m-%d')
+            results = {}
+            for category in backend.CATEGORY_PROMPTS:
+                with open(os.path.join('data', f"{today}-{category}.json"), 'r') as f:
+                    results[category] = not is_sample_briefing(json.load(f))
+            # Leave the directory before it is removed
+            os.chdir(cwd)
+    finally:
+        os.chdir(cwd)
+        backend.PERPLEXITY_API_BASE, backend.PERPLEXITY_API_KEY, backend.limiter = saved
+        server.shutdown()
+        server.server_close()
+    return elapsed, results
+
+
+def add_stub_options(parser):
+    parser.add_argument('--fixtures', default=FIXTURES_DIR, help="Fixture directory (default: %(default)s)")
+    parser.add_argument('--speed', type=float, default=0.0,
+                        help="Replay recorded latency times this factor (0: no latency)")
+    parser.add_argument('--delay', type=float, default=0.0, help="Extra seconds before every response")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of requests answered with 500")
+    parser.add_argument('--rpm', type=int, help="Answer 429 above this many requests per minute")
+    parser.add_argument('--retry-after', type=float, help="Retry-After sent with 429s (default: until a slot frees)")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed for injected errors")
+
+
+def stub_options(args):
+    return dict(speed=args.speed, delay=args.delay, error_rate=args.error_rate,
+                rpm=args.rpm, retry_after=args.retry_after, seed=args.seed)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Record and replay Perplexity API exchanges")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    serve = commands.add_parser('serve', help="Replay fixtures from a local stub API")
+    serve.add_argument('--port', type=int, default=8010)
+    add_stub_options(serve)
+
+    record = commands.add_parser('record', help="Proxy to the real API and save fixtures")
+    record.add_argument('--port', type=int, default=8010)
+    record.add_argument('--fixtures', default=FIXTURES_DIR)
+    record.add_argument('--upstream', default=UPSTREAM)
+
+    fixture = commands.add_parser('fixture', help="Make fixtures from stored briefings")
+    fixture.add_argument('briefings', nargs='+', help="data/<date>-<category>.json files")
+    fixture.add_argument('--fixtures', default=FIXTURES_DIR)
+    fixture.add_argument('--latency', type=float, default=0.0, help="Latency (seconds) recorded in the fixture")
+
+    pipeline = commands.add_parser('pipeline', help="Run backend.main() against the stub")
+    add_stub_options(pipeline)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.command == 'serve':
+        fixtures = load_fixtures(args.fixtures)
+        server = ReplayServer(('127.0.0.1', args.port), fixtures, **stub_options(args))
+        print(f"Replaying {len(fixtures)} fixtures from {args.fixtures} on http://127.0.0.1:{args.port}")
+        server.serve_forever()
+    elif args.command == 'record':
+        server = RecordServer(('127.0.0.1', args.port), args.upstream, args.fixtures)
+        print(f"Recording {args.upstream} into {args.fixtures} via http://127.0.0.1:{args.port}")
+        server.serve_forever()
+    elif args.command == 'fixture':
+        for filename in args.briefings:
+            fixture = fixture_from_briefing(filename, latency=args.latency)
+            name = f"{os.path.basename(filename)[:-len('.json')]}.json"
+            print(f"Wrote {save_fixture(fixture, args.fixtures, name)}")
+    else:
+        elapsed, results = run_pipeline(args.fixtures, **stub_options(args))
+        print(f"Offline pipeline finished in {elapsed * 1000:.0f}ms: {results}")
+        sys.exit(0 if all(results.values()) else 1)
@@ -0,0 +1,191 @@
+"""
+Data Retention and Compaction
+
+Keeps data/ small. The newest HOT_DAYS days of briefings stay as individual
+data/YYYY-MM-DD-<category>.json files. Older days are moved into gzipped
+monthly bundles data/archive/YYYY-MM.json.gz:
+
+    {"month": "2025-09", "briefings": {"2025-09-01-healthcare.json": {...}, ...}}
+
+Then data/index.json is rewritten. It keeps the newest files per category
+(the list the dashboard reads) and adds an "archive" section describing the
+bundles. news_data.load_briefing() and iter_briefings() read both tiers, so
+/api/<category>?date=YYYY-MM-DD and the analytics.py / ranking.py rebuilds
+still see every day.
+
+The shared topic cache (data/topics/) and every tenant's directory
+(data/tenants/<tenant>/) are compacted the same way into their own
+<dir>/archive/YYYY-MM.json.gz bundles, with a separate hot window
+(TENANT_HOT_DAYS, --tenant-hot-days). Their index.json files only list the
+newest days, so they are left as they are.
+
+Each hot window is counted back from the newest file in its directory, not
+from today, so a stalled pipeline never archives everything. Compaction is idempotent: a
+day that reappears as a file (e.g. after a backfill) replaces its archived
+copy on the next run.
+
+    python retention.py                  # compact, then rewrite data/index.json
+    python retention.py --hot-days 60 --tenant-hot-days 14 --dry-run
+    python retention.py --index-only
+"""
+
+import os
+import io
+import sys
+import gzip
+import json
+import re
+import argparse
+from datetime import date, timedelta
+
+from news_data import DATA_DIR, DATA_FILE_PATTERN, CATEGORIES, ARCHIVE_FILE_PATTERN, archive_path, read_archive
+
+# Days kept as individual files
+HOT_DAYS = int(os.environ.get('NEWS_HOT_DAYS', '30'))
+# Days of topic cache and tenant files kept as individual files
+TENANT_HOT_DAYS = int(os.environ.get('NEWS_TENANT_HOT_DAYS', str(HOT_DAYS)))
+# Dated files in data/topics/ and data/tenants/<tenant>/ (<date>-<topic>[-<key>].json)
+SIDE_FILE_PATTERN = re.compile(r'^(\d{4}-\d{2}-\d{2})-[a-z0-9][a-z0-9_-]*\.json$')
+# Files listed per category in data/index.json
+INDEX_FILES_PER_CATEGORY = 5
+
+
+def write_archive(path, month, briefings):
+    """Write a monthly bundle atomically, with fixed gzip metadata so unchanged bundles are byte-identical"""
+    payload = json.dumps({"month": month, "briefings": briefings}, sort_keys=True, separators=(',', ':'))
+    buffer = io.BytesIO()
+    with gzip.GzipFile(filename='', mode='wb', fileobj=buffer, mtime=0) as f:
+        f.write(payload.encode('utf-8'))
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(buffer.getvalue())
+    os.replace(tmp_path, path)
+
+
+def plan_compaction(data_dir=DATA_DIR, hot_days=HOT_DAYS, pattern=DATA_FILE_PATTERN):
+    """{month: [filenames]} of dated files in data_dir older than its hot window"""
+    names = sorted(name for name in os.listdir(data_dir) if pattern.match(name))
+    if not names:
+        return {}
+    newest = max(pattern.match(name).group(1) for name in names)
+    cutoff = (date.fromisoformat(newest) - timedelta(days=hot_days - 1)).isoformat()
+    months = {}
+    for name in names:
+        day = pattern.match(name).group(1)
+        if day < cutoff:
+            months.setdefault(day[:7], []).append(name)
+    return months
+
+
+def side_dirs(data_dir=DATA_DIR):
+    """The topic cache and every tenant directory that exist under data_dir"""
+    dirs = [os.path.join(data_dir, 'topics')]
+    tenants_dir = os.path.join(data_dir, 'tenants')
+    if os.path.isdir(tenants_dir):
+        dirs += [os.path.join(tenants_dir, name) for name in sorted(os.listdir(tenants_dir))]
+    return [d for d in dirs if os.path.isdir(d)]
+
+
+def compact(data_dir=DATA_DIR, hot_days=HOT_DAYS, dry_run=False, pattern=DATA_FILE_PATTERN):
+    """Move files older than the hot window into monthly bundles; returns files archived"""
+    months = plan_compaction(data_dir, hot_days, pattern)
+    archived = 0
+    for month, names in sorted(months.items()):
+        path = archive_path(month, data_dir)
+        print(f"{'Would archive' if dry_run else 'Archiving'} {len(names)} files into {path}")
+        if dry_run:
+            archived += len(names)
+            continue
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        briefings = read_archive(path) if os.path.exists(path) else {}
+        moved = []
+        for name in names:
+            try:
+                with open(os.path.join(data_dir, name), 'r') as f:
+                    briefings[name] = json.load(f)
+            except (OSError, ValueError) as e:
+                # Unreadable files stay where they are for a human to look at
+                print(f"Leaving {name} in place: {e}")
+                continue
+            moved.append(name)
+        write_archive(path, month, briefings)
+        # Delete the originals only once the bundle reads back with every file in it
+        stored = read_archive(path)
+        for name in moved:
+            if stored.get(name) == briefings[name]:
+                os.remove(os.path.join(data_dir, name))
+                archived += 1
+    return archived
+
+
+def compact_all(data_dir=DATA_DIR, hot_days=HOT_DAYS, tenant_hot_days=TENANT_HOT_DAYS, dry_run=False):
+    """Compact data/ itself, then the topic cache and each tenant directory"""
+    archived = compact(data_dir, hot_days, dry_run)
+    for directory in side_dirs(data_dir):
+        archived += compact(directory, tenant_hot_days, dry_run, pattern=SIDE_FILE_PATTERN)
+    return archived
+
+
+def build_index(data_dir=DATA_DIR):
+    """data/index.json contents: newest files per category plus the archive tier"""
+    files = {}
+    for name in sorted(os.listdir(data_dir), reverse=True):
+        match = DATA_FILE_PATTERN.match(name)
+        if match:
+            files.setdefault(match.group(2), []).append(name)
+    index = {category: files.get(category, [])[:INDEX_FILES_PER_CATEGORY] for category in CATEGORIES}
+
+    archive = {}
+    archive_dir = os.path.join(data_dir, 'archive')
+    for name in sorted(os.listdir(archive_dir)) if os.path.isdir(archive_dir) else []:
+        match = ARCHIVE_FILE_PATTERN.match(name)
+        if not match:
+            continue
+        days = {}
+        for filename in read_archive(os.path.join(archive_dir, name)):
+            day, category = DATA_FILE_PATTERN.match(filename).groups()
+            days.setdefault(category, []).append(day)
+        archive[match.group(1)] = {
+            "file": f"archive/{name}",
+            "briefings": {category: len(dates) for category, dates in sorted(days.items())},
+            "first": min(min(dates) for dates in days.values()) if days else None,
+            "last": max(max(dates) for dates in days.values()) if days else None,
+        }
+    index["archive"] = archive
+    return index
+
+
+def write_index(data_dir=DATA_DIR):
+    index = build_index(data_dir)
+    path = os.path.join(data_dir, 'index.json')
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(index, f, indent=2)
+        f.write('\n')
+    os.replace(tmp_path, path)
+    return index
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Archive old briefings into monthly bundles and rewrite the index")
+    parser.add_argument('--hot-days', type=int, default=HOT_DAYS,
+                        help="Days kept as individual files (default: %(default)s)")
+    parser.add_argument('--tenant-hot-days', type=int, default=TENANT_HOT_DAYS,
+                        help="Days of data/topics/ and data/tenants/ files kept as individual files (default: %(default)s)")
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    parser.add_argument('--dry-run', action='store_true', help="Only report what would be archived")
+    parser.add_argument('--index-only', action='store_true', help="Only rewrite data/index.json")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.hot_days < 1 or args.tenant_hot_days < 1:
+        sys.exit("--hot-days and --tenant-hot-days must be at least 1")
+    if not args.index_only:
+        archived = compact_all(args.data_dir, args.hot_days, args.tenant_hot_days, dry_run=args.dry_run)
+        print(f"{'Would archive' if args.dry_run else 'Archived'} {archived} files")
+    if not args.dry_run:
+        index = write_index(args.data_dir)
+        print(f"Updated {os.path.join(args.data_dir, 'index.json')}: "
+              f"{', '.join(f'{c} {len(index[c])} files' for c in CATEGORIES)}, {len(index['archive'])} archive bundles")
@@ -10,10 +10,7 @@ Requirements:
 """
 
 try:
-    from flask import Flask, jsonify, send_from_directory
-    import os
-    import json
-    from datetime import datetime, timedelta
+    from flask import Flask, jsonify, send_from_directory, request, g
     FLASK_AVAILABLE = True
     app = Flask(__name__)
 except ImportError:
@@ -42,6 +39,28 @@ except ImportError:
             with open(path, 'r') as f:
                 return f.read()
 
+from profiling import profiler
+from news_data import news_cache
+from analytics import stats_cache
+from ranking import rank_request
+
+# Optional per-request profiling (see profiling.py)
+if FLASK_AVAILABLE:
+    @app.before_request
+    def start_request_profile():
+        if profiler.should_profile(request.headers):
+            g.profile_session = profiler.start(request.path)
+
+    @app.after_request
+    def stop_request_profile(response):
+        session = g.pop('profile_session', None)
+        if session is not None:
+            path = profiler.stop(session)
+            # Only admins learn where the profile went; sampled clients see nothing
+            if path and profiler.is_admin(request.headers.get('X-Profile')):
+                response.headers['X-Profile-Path'] = path
+        return response
+
 # Serve static files
 @app.route('/')
 def index():
@@ -51,92 +70,29 @@ def index():
 def static_files(path):
     return send_from_directory('.', path)
 
-# Helper function to get latest data file
-def get_latest_data_file(category):
-    """Get the most recent data file for a category"""
-    try:
-        # List all files in data directory
-        data_files = [f for f in os.listdir('data') if f.endswith(f'{category}.json') and not f.startswith('test')]
-        if not data_files:
-            return None
-        
-        # Sort by date (filename format: YYYY-MM-DD-category.json)
-        # Extract date from filename and sort properly
-        def extract_date(filename):
-            try:
-                # Extract date part (YYYY-MM-DD) from filename
-                date_part = filename.split('-')[0:3]
-                return '-'.join(date_part)
-            except:
-                return '0000-00-00'  # Default for sorting
-                
-        data_files.sort(key=extract_date, reverse=True)
-        latest_file = data_files[0]
-        return os.path.join('data', latest_file)
-    except Exception as e:
-        print(f"Error finding latest {category} file: {e}")
-        return None
+def json_response(body):
+    """Return already-encoded JSON bytes as a response"""
+    if FLASK_AVAILABLE:
+        return app.response_class(body, mimetype='application/json')
+    return body.decode(), 200
+
+def category_response(category):
+    """Latest briefing for a category, or a past day's with ?date=YYYY-MM-DD"""
+    day = request.args.get('date') if FLASK_AVAILABLE else None
+    if not day:
+        return json_response(news_cache.get_json(category))
+    # A past day, from data/ or the monthly archive
+    body = news_cache.briefing_json(category, day)
+    if body is None:
+        return jsonify({"error": f"No {category} briefing for {day}"}), 404
+    return json_response(body)
 
 # API endpoints
 @app.route('/api/healthcare')
 def get_healthcare_news():
     """Get latest healthcare news"""
     try:
-        # Try to get the latest data file
-        data_file = get_latest_data_file('healthcare')
-        
-        if data_file and os.path.exists(data_file):
-            # Load data from file
-            with open(data_file, 'r') as f:
-                raw_data = json.load(f)
-                # Extract the structure that the frontend expects
-                data = {
-                    "weekly_top_story": raw_data["weekly_top_story"],
-                    "stories": raw_data["stories"]
-                }
-        else:
-            # Fallback to sample data with new structure
-            data = {
-                "weekly_top_story": {
-                    "headline": "Revolutionary CAR-T Cell Therapy Shows 90% Remission Rate in Pediatric Leukemia",
-                    "summary": "A new CAR-T cell therapy targeting pediatric leukemia has demonstrated remarkable efficacy in Phase II trials, with 90% of patients achieving complete remission after six months.",
-                    "source": "The Lancet",
-                    "importance": 5,
-                    "impact_to_me": 5,
-                    "category": "Research",
-                    "url": "https://www.thelancet.com/article"
-                },
-                "stories": [
-                    {
-                        "headline": "FDA Announces New Fast-Track Program for Gene Therapies",
-                        "summary": "The FDA has unveiled a new expedited review pathway aimed at accelerating the approval of gene therapies for rare diseases, potentially cutting approval times by up to 50%.",
-                        "source": "STAT News",
-                        "importance": 5,
-                        "impact_to_me": 4,
-                        "category": "Policy",
-                        "url": "https://www.statnews.com/fda-fast-track"
-                    },
-                    {
-                        "headline": "AI Diagnostic Tool Achieves Radiologist-Level Accuracy",
-                        "summary": "A new artificial intelligence system for detecting lung cancer on CT scans has matched or exceeded the diagnostic accuracy of experienced radiologists in a large clinical trial.",
-                        "source": "NEJM",
-                        "importance": 4,
-                        "impact_to_me": 4,
-                        "category": "Tech",
-                        "url": "https://www.nejm.org/ai-diagnostic"
-                    },
-                    {
-                        "headline": "Telehealth Reimbursement Rules Expanded for Rural Areas",
-                        "summary": "CMS has expanded Medicare reimbursement for telehealth services in rural communities, removing geographic restrictions that previously limited access to virtual care.",
-                        "source": "Fierce Healthcare",
-                        "importance": 4,
-                        "impact_to_me": 3,
-                        "category": "Policy",
-                        "url": "https://www.fiercehealthcare.com/telehealth"
-                    }
-                ]
-            }
-        return jsonify(data)
+        return category_response('healthcare')
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -144,61 +100,7 @@ def get_healthcare_news():
 def get_general_news():
     """Get latest general news"""
     try:
-        # Try to get the latest data file
-        data_file = get_latest_data_file('general')
-        
-        if data_file and os.path.exists(data_file):
-            # Load data from file
-            with open(data_file, 'r') as f:
-                raw_data = json.load(f)
-                # Extract the structure that the frontend expects
-                data = {
-                    "weekly_top_story": raw_data["weekly_top_story"],
-                    "stories": raw_data["stories"]
-                }
-        else:
-            # Fallback to sample data with new structure
-            data = {
-                "weekly_top_story": {
-                    "headline": "Breakthrough in Nuclear Fusion Energy Achieved",
-                    "summary": "Scientists at a major research facility have achieved a net energy gain in nuclear fusion, bringing humanity one step closer to unlimited clean energy.",
-                    "source": "AP News",
-                    "importance": 5,
-                    "impact_to_me": 5,
-                    "category": "Science",
-                    "url": "https://www.apnews.com/fusion-energy"
-                },
-                "stories": [
-                    {
-                        "headline": "Quantum Supremacy Claimed by Three Major Tech Companies",
-                        "summary": "Google, IBM, and a leading Chinese tech firm have simultaneously announced they've achieved quantum supremacy, solving complex problems in minutes that would take traditional supercomputers millennia.",
-                        "source": "The Economist",
-                        "importance": 5,
-                        "impact_to_me": 5,
-                        "category": "Technology",
-                        "url": "https://www.economist.com/quantum-supremacy"
-                    },
-                    {
-                        "headline": "Global AI Regulation Framework Agreed by G7 Nations",
-                        "summary": "G7 countries have reached a preliminary agreement on a unified framework for AI governance, establishing new standards for transparency and safety in artificial intelligence development.",
-                        "source": "Reuters",
-                        "importance": 5,
-                        "impact_to_me": 4,
-                        "category": "Global",
-                        "url": "https://www.reuters.com/ai-regulation"
-                    },
-                    {
-                        "headline": "Renewable Energy Investments Surpass Fossil Fuels for First Time",
-                        "summary": "Global investment in renewable energy projects has exceeded fossil fuel investments for the first time in history, signaling a major shift in the energy sector's trajectory.",
-                        "source": "BBC",
-                        "importance": 4,
-                        "impact_to_me": 3,
-                        "category": "Business",
-                        "url": "https://www.bbc.com/renewable-energy"
-                    }
-                ]
-            }
-        return jsonify(data)
+        return category_response('general')
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -206,119 +108,44 @@ def get_general_news():
 def get_latest_news():
     """Get both healthcare and general news from the latest data files"""
     try:
-        # Get healthcare data
-        healthcare_file = get_latest_data_file('healthcare')
-        if healthcare_file and os.path.exists(healthcare_file):
-            with open(healthcare_file, 'r') as f:
-                raw_data = json.load(f)
-                # Extract the structure that the frontend expects
-                healthcare_data = {
-                    "weekly_top_story": raw_data["weekly_top_story"],
-                    "stories": raw_data["stories"]
-                }
-        else:
-            # Fallback to sample data
-            healthcare_data = {
-                "weekly_top_story": {
-                    "headline": "Revolutionary CAR-T Cell Therapy Shows 90% Remission Rate in Pediatric Leukemia",
-                    "summary": "A new CAR-T cell therapy targeting pediatric leukemia has demonstrated remarkable efficacy in Phase II trials, with 90% of patients achieving complete remission after six months.",
-                    "source": "The Lancet",
-                    "importance": 5,
-                    "impact_to_me": 5,
-                    "category": "Research",
-                    "url": "https://www.thelancet.com/article"
-                },
-                "stories": [
-                    {
-                        "headline": "FDA Announces New Fast-Track Program for Gene Therapies",
-                        "summary": "The FDA has unveiled a new expedited review pathway aimed at accelerating the approval of gene therapies for rare diseases, potentially cutting approval times by up to 50%.",
-                        "source": "STAT News",
-                        "importance": 5,
-                        "impact_to_me": 4,
-                        "category": "Policy",
-                        "url": "https://www.statnews.com/fda-fast-track"
-                    },
-                    {
-                        "headline": "AI Diagnostic Tool Achieves Radiologist-Level Accuracy",
-                        "summary": "A new artificial intelligence system for detecting lung cancer on CT scans has matched or exceeded the diagnostic accuracy of experienced radiologists in a large clinical trial.",
-                        "source": "NEJM",
-                        "importance": 4,
-                        "impact_to_me": 4,
-                        "category": "Tech",
-                        "url": "https://www.nejm.org/ai-diagnostic"
-                    },
-                    {
-                        "headline": "Telehealth Reimbursement Rules Expanded for Rural Areas",
-                        "summary": "CMS has expanded Medicare reimbursement for telehealth services in rural communities, removing geographic restrictions that previously limited access to virtual care.",
-                        "source": "Fierce Healthcare",
-                        "importance": 4,
-                        "impact_to_me": 3,
-                        "category": "Policy",
-                        "url": "https://www.fiercehealthcare.com/telehealth"
-                    }
-                ]
-            }
-        
-        # Get general data
-        general_file = get_latest_data_file('general')
-        if general_file and os.path.exists(general_file):
-            with open(general_file, 'r') as f:
-                raw_data = json.load(f)
-                # Extract the structure that the frontend expects
-                general_data = {
-                    "weekly_top_story": raw_data["weekly_top_story"],
-                    "stories": raw_data["stories"]
-                }
-        else:
-            # Fallback to sample data
-            general_data = {
-                "weekly_top_story": {
-                    "headline": "Breakthrough in Nuclear Fusion Energy Achieved",
-                    "summary": "Scientists at a major research facility have achieved a net energy gain in nuclear fusion, bringing humanity one step closer to unlimited clean energy.",
-                    "source": "AP News",
-                    "importance": 5,
-                    "impact_to_me": 5,
-                    "category": "Science",
-                    "url": "https://www.apnews.com/fusion-energy"
-                },
-                "stories": [
-                    {
-                        "headline": "Quantum Supremacy Claimed by Three Major Tech Companies",
-                        "summary": "Google, IBM, and a leading Chinese tech firm have simultaneously announced they've achieved quantum supremacy, solving complex problems in minutes that would take traditional supercomputers millennia.",
-                        "source": "The Economist",
-                        "importance": 5,
-                        "impact_to_me": 5,
-                        "category": "Technology",
-                        "url": "https://www.economist.com/quantum-supremacy"
-                    },
-                    {
-                        "headline": "Global AI Regulation Framework Agreed by G7 Nations",
-                        "summary": "G7 countries have reached a preliminary agreement on a unified framework for AI governance, establishing new standards for transparency and safety in artificial intelligence development.",
-                        "source": "Reuters",
-                        "importance": 5,
-                        "impact_to_me": 4,
-                        "category": "Global",
-                        "url": "https://www.reuters.com/ai-regulation"
-                    },
-                    {
-                        "headline": "Renewable Energy Investments Surpass Fossil Fuels for First Time",
-                        "summary": "Global investment in renewable energy projects has exceeded fossil fuel investments for the first time in history, signaling a major shift in the energy sector's trajectory.",
-                        "source": "BBC",
-                        "importance": 4,
-                        "impact_to_me": 3,
-                        "category": "Business",
-                        "url": "https://www.bbc.com/renewable-energy"
-                    }
-                ]
-            }
-        
-        return jsonify({
-            "healthcare": healthcare_data,
-            "general": general_data
-        })
+        return json_response(news_cache.latest_json())
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/stats')
+def get_stats():
+    """Get precomputed trend statistics over all briefings"""
+    try:
+        return json_response(stats_cache.get_json())
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/rank', methods=['GET', 'POST'])
+def rank_stories():
+    """Rank recent stories for a batch of user profiles (see ranking.py)"""
+    payload = request.get_json(silent=True) if request.method == 'POST' else {}
+    try:
+        return jsonify(rank_request({} if payload is None else payload))
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/admin/profiling', methods=['GET', 'POST'])
+def profiling_admin():
+    """Inspect or change the profiling sample rate at runtime"""
+    if not profiler.is_admin(request.headers.get('X-Admin-Token')):
+        return jsonify({"error": "forbidden"}), 403
+    if request.method == 'POST':
+        settings = request.get_json(silent=True) or {}
+        if not isinstance(settings, dict):
+            return jsonify({"error": "expected a JSON object"}), 400
+        try:
+            return jsonify(profiler.configure(settings.get('sample_rate'), settings.get('interval')))
+        except (TypeError, ValueError) as e:
+            return jsonify({"error": str(e)}), 400
+    return jsonify(profiler.status())
+
 if __name__ == '__main__' and FLASK_AVAILABLE:
     app.run(debug=True, host='0.0.0.0', port=5000)
 elif __name__ == '__main__':
@@ -1,22 +1,345 @@
 """
 Simple HTTP server for serving static files for GitHub Pages deployment.
+
+Static files are served from an in-memory cache of immutable bytes (small
+files) or streamed with sendfile (large files), over HTTP/1.1 keep-alive
+connections, with support for Range and conditional (ETag/Last-Modified)
+requests. A cached hit skips URL parsing and stat() calls and goes out in one
+write, and request headers are parsed without the email package, so even a
+client that opens a new connection per request costs less server CPU than
+with the stdlib handler. Run `python bench_server.py` to compare.
+
+Connections are handled by a fixed pool of worker threads. A connection keeps
+its worker while the client sends requests (pipelined requests are answered in
+order) and is closed after KEEPALIVE_TIMEOUT seconds idle, or sooner when
+other connections are waiting for a worker.
+
+    python simple_server.py [--port 8000] [--workers 16] [--keepalive-timeout 5]
 """
 
 import http.server
-import socketserver
+import socket
 import os
 import json
+import time
+import queue
+import select
+import argparse
+import selectors
+import threading
+import email.utils
 from urllib.parse import urlparse, parse_qs
+from profiling import profiler
+from news_data import news_cache, CATEGORIES
+from analytics import stats_cache
+from ranking import rank_request
+
+# Files up to this size are cached in memory; larger ones are sent with sendfile
+STATIC_CACHE_MAX_FILE_SIZE = 512 * 1024
+# Seconds a cached file is trusted before its mtime and size are checked again
+STATIC_REVALIDATE_INTERVAL = 1.0
+# Request paths remembered as naming a static file
+STATIC_MAX_ROUTES = 4096
+
+# Limits on request headers, as in http.client
+MAX_HEADER_LINE = 65536
+MAX_HEADERS = 100
+# Largest POST body read into memory (an /api/rank batch of thousands of users)
+MAX_POST_BODY = 1024 * 1024
+
+# Seconds an idle keep-alive connection may hold a worker thread
+KEEPALIVE_TIMEOUT = 5.0
+# How often an idle connection checks whether others are queued for a worker
+BUSY_KEEPALIVE_TIMEOUT = 0.05
+
+
+class StaticFile:
+    """Metadata (and, for small files, contents) of one static file"""
+    __slots__ = ('path', 'size', 'mtime', 'etag', 'last_modified', 'content_type', 'body',
+                 'full_headers', 'checked')
+
+    def __init__(self, path, stat, content_type, body):
+        self.path = path
+        self.size = stat.st_size
+        self.mtime = stat.st_mtime_ns
+        self.etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+        self.last_modified = email.utils.formatdate(stat.st_mtime, usegmt=True)
+        self.content_type = content_type
+        self.body = body
+        # Headers after Server/Date of a plain 200 response, encoded once
+        self.full_headers = (
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {self.size}\r\n"
+            f"Last-Modified: {self.last_modified}\r\n"
+            f"ETag: {self.etag}\r\n"
+            f"Accept-Ranges: bytes\r\n\r\n"
+        ).encode('latin-1')
+        # When the file was last stat()ed (time.monotonic())
+        self.checked = time.monotonic()
+
+
+class StaticFileCache:
+    """Cache of static files, revalidated against the file's mtime and size
+
+    A file is stat()ed at most once per STATIC_REVALIDATE_INTERVAL, and
+    request paths that resolved to a regular file are remembered, so a
+    cached hit needs no URL parsing or file system calls.
+    """
+
+    def __init__(self, max_file_size=STATIC_CACHE_MAX_FILE_SIZE):
+        self.max_file_size = max_file_size
+        self._entries = {}
+        # request path -> file system path, for paths that named a file
+        self.routes = {}
+        self._lock = threading.Lock()
+
+    def get(self, path, guess_type):
+        """Return a current StaticFile for path (raises OSError if missing)"""
+        entry = self._entries.get(path)
+        now = time.monotonic()
+        if entry is not None and now - entry.checked < STATIC_REVALIDATE_INTERVAL:
+            return entry
+        stat = os.stat(path)
+        if entry is not None and entry.mtime == stat.st_mtime_ns and entry.size == stat.st_size:
+            entry.checked = now
+            return entry
+        body = None
+        if stat.st_size <= self.max_file_size:
+            with open(path, 'rb') as f:
+                body = f.read()
+        entry = StaticFile(path, stat, guess_type(path), body)
+        with self._lock:
+            self._entries[path] = entry
+        return entry
+
+    def remember(self, request_path, path):
+        """Map a request path straight to the file it named (query strings excluded, bounded)"""
+        if '?' not in request_path and len(self.routes) < STATIC_MAX_ROUTES:
+            self.routes[request_path] = path
+
+    def forget(self, path):
+        with self._lock:
+            self._entries.pop(path, None)
+            for request_path in [r for r, p in self.routes.items() if p == path]:
+                self.routes.pop(request_path, None)
+
+
+static_cache = StaticFileCache()
+
+# (second, encoded Date header line) for the current second
+_date_header = (None, b'')
+
+
+def http_date():
+    """The Date header line for now, formatted once per second"""
+    global _date_header
+    now = int(time.time())
+    if _date_header[0] != now:
+        _date_header = (now, f"Date: {email.utils.formatdate(now, usegmt=True)}\r\n".encode('latin-1'))
+    return _date_header[1]
+
+
+class RequestHeaders(dict):
+    """Request headers keyed case-insensitively; the first value of a repeated header wins
+
+    Answers get(), [] and `in` like the email.message.Message the stdlib
+    builds, without the email parser's per-request cost.
+    """
+
+    def get(self, name, default=None):
+        return dict.get(self, name.lower(), default)
+
+    def __getitem__(self, name):
+        return dict.get(self, name.lower())
+
+    def __contains__(self, name):
+        return dict.__contains__(self, name.lower())
+
+
+def is_within(path, directory):
+    """True if path is directory or inside it"""
+    directory = os.path.abspath(directory)
+    return os.path.commonpath([os.path.abspath(path), directory]) == directory
+
+
+def parse_range(header, size):
+    """Parse a single "bytes=" Range header into (start, end) inclusive
+
+    Returns None for an unsatisfiable range and False for a header we don't
+    handle (multiple ranges, other units), which means "send the whole file".
+    """
+    units, _, spec = header.partition('=')
+    if units.strip() != 'bytes' or ',' in spec:
+        return False
+    first, _, last = spec.strip().partition('-')
+    try:
+        if first == '':
+            # Suffix range: the last N bytes
+            length = int(last)
+            if length <= 0:
+                return None
+            return max(0, size - length), size - 1
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        return False
+    if start >= size or end < start:
+        return None
+    return start, min(end, size - 1)
+
 
 class NewsDashboardHandler(http.server.SimpleHTTPRequestHandler):
+    # Keep connections open between requests (every response sets Content-Length)
+    protocol_version = 'HTTP/1.1'
+    # Socket timeout, i.e. how long a keep-alive connection may sit idle
+    timeout = KEEPALIVE_TIMEOUT
+
+    def setup(self):
+        super().setup()
+        # Headers and body go out in separate writes; without this, Nagle's
+        # algorithm holds the body back on keep-alive connections
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def handle(self):
+        """Serve requests on this connection until it closes or idles out"""
+        self.close_connection = True
+        self.handle_one_request()
+        while not self.close_connection and self.wait_for_request():
+            self.handle_one_request()
+
+    def parse_request(self):
+        """Parse the request line and headers
+
+        Same checks and connection handling as
+        BaseHTTPRequestHandler.parse_request, but the headers go into a
+        RequestHeaders dict: parsing them with the email package was the
+        largest share of the CPU time per request.
+        """
+        self.command = None
+        self.request_version = version = self.default_request_version
+        self.close_connection = True
+        requestline = str(self.raw_requestline, 'iso-8859-1').rstrip('\r\n')
+        self.requestline = requestline
+        words = requestline.split()
+        if not words:
+            return False
+        if len(words) >= 3:
+            version = words[-1]
+            numbers = version[5:].split('.') if version.startswith('HTTP/') else []
+            if len(numbers) != 2 or not all(n.isdigit() and len(n) <= 10 for n in numbers):
+                self.send_error(400, f"Bad request version ({version!r})")
+                return False
+            version_number = int(numbers[0]), int(numbers[1])
+            if version_number >= (1, 1) and self.protocol_version >= "HTTP/1.1":
+                self.close_connection = False
+            if version_number >= (2, 0):
+                self.send_error(505, f"Invalid HTTP version ({version[5:]})")
+                return False
+            self.request_version = version
+        if not 2 <= len(words) <= 3:
+            self.send_error(400, f"Bad request syntax ({requestline!r})")
+            return False
+        command, path = words[:2]
+        if len(words) == 2:
+            self.close_connection = True
+            if command != 'GET':
+                self.send_error(400, f"Bad HTTP/0.9 request type ({command!r})")
+                return False
+        if path.startswith('//'):
+            # Clients read //path as a host; keep it a local path
+            path = '/' + path.lstrip('/')
+        self.command, self.path = command, path
+
+        headers = RequestHeaders()
+        name = None
+        for _ in range(MAX_HEADERS + 1):
+            line = self.rfile.readline(MAX_HEADER_LINE + 1)
+            if len(line) > MAX_HEADER_LINE:
+                self.send_error(431, "Line too long")
+                return False
+            if line in (b'\r\n', b'\n', b''):
+                break
+            line = line.decode('iso-8859-1')
+            if line[0] in ' \t':
+                # Obsolete line folding: continues the previous header
+                if name is not None and headers.get(name) is not None:
+                    dict.__setitem__(headers, name, f"{headers.get(name)} {line.strip()}")
+                continue
+            name, sep, value = line.partition(':')
+            name = name.strip().lower()
+            if sep and name not in headers:
+                dict.__setitem__(headers, name, value.strip())
+        else:
+            self.send_error(431, "Too many headers")
+            return False
+        self.headers = headers
+
+        connection = headers.get('Connection', '').lower()
+        if connection == 'close':
+            self.close_connection = True
+        elif connection == 'keep-alive' and self.protocol_version >= "HTTP/1.1":
+            self.close_connection = False
+        if (headers.get('Expect', '').lower() == '100-continue' and
+                self.protocol_version >= "HTTP/1.1" and self.request_version >= "HTTP/1.1"):
+            return self.handle_expect_100()
+        return True
+
+    def wait_for_request(self):
+        """Wait for the next request on a kept-alive connection
+
+        Returns False once the connection has been idle for `timeout`
+        seconds, or for BUSY_KEEPALIVE_TIMEOUT while other connections are
+        queued for a worker, so idle clients can't starve the pool.
+        """
+        # A pipelined request may already be in the read buffer; peek
+        # without blocking to find out
+        self.connection.settimeout(0.0)
+        try:
+            if self.rfile.peek(1):
+                return True
+        finally:
+            self.connection.settimeout(self.timeout)
+
+        waiting = getattr(self.server, 'connections_waiting', None)
+        idle_since = time.monotonic()
+        if hasattr(select, 'poll'):
+            # poll() needs no kernel object per connection, unlike epoll
+            poller = select.poll()
+            poller.register(self.connection, select.POLLIN)
+            ready = lambda: poller.poll(BUSY_KEEPALIVE_TIMEOUT * 1000)
+        else:
+            poller = selectors.DefaultSelector()
+            poller.register(self.connection, selectors.EVENT_READ)
+            ready = lambda: poller.select(BUSY_KEEPALIVE_TIMEOUT)
+        try:
+            while True:
+                if ready():
+                    return True
+                idle = time.monotonic() - idle_since
+                if idle >= self.timeout or (waiting is not None and waiting()):
+                    return False
+        finally:
+            if not hasattr(select, 'poll'):
+                poller.close()
+
     def do_GET(self):
+        # Profile the request if sampling or the X-Profile header selects it
+        with profiler.profile(urlparse(self.path).path, headers=self.headers):
+            return self.handle_get()
+
+    def handle_get(self):
         # Parse the URL
         parsed_url = urlparse(self.path)
         path = parsed_url.path
         
+        # Profiling admin endpoint
+        if path == '/api/admin/profiling':
+            self.handle_profiling_admin()
+            return
+
         # API endpoints
         if path.startswith('/api/'):
-            self.handle_api_request(path[5:])  # Remove '/api/' prefix
+            self.handle_api_request(path[5:], parse_qs(parsed_url.query))  # Remove '/api/' prefix
             return
         
         # Static files
@@ -25,121 +348,253 @@ class NewsDashboardHandler(http.server.SimpleHTTPRequestHandler):
         elif path == '/':
             self.path = '/index.html'
             
-        return http.server.SimpleHTTPRequestHandler.do_GET(self)
+        return self.serve_static()
+
+    def do_POST(self):
+        with profiler.profile(urlparse(self.path).path, headers=self.headers):
+            path = urlparse(self.path).path
+            if path not in ('/api/rank', '/api/admin/profiling'):
+                self.send_error(404, "API endpoint not found")
+                return
+            try:
+                length = int(self.headers.get('Content-Length') or 0)
+            except ValueError:
+                length = -1
+            if length < 0 or length > MAX_POST_BODY:
+                # The body is never read, so the connection can't be reused
+                self.close_connection = True
+                if length < 0:
+                    self.send_error(400, "Invalid Content-Length")
+                else:
+                    self.send_error(413, f"Request body larger than {MAX_POST_BODY} bytes")
+                return
+            try:
+                payload = json.loads(self.rfile.read(length) or b'{}')
+            except (TypeError, ValueError) as e:
+                self.send_error(400, str(e))
+                return
+            if path == '/api/admin/profiling':
+                self.handle_profiling_admin(payload)
+                return
+            try:
+                result = rank_request(payload)
+            except (TypeError, ValueError) as e:
+                self.send_error(400, str(e))
+                return
+            except Exception as e:
+                self.send_error(500, f"Internal server error: {str(e)}")
+                return
+            self.send_json_response(result)
+
+    def do_HEAD(self):
+        if urlparse(self.path).path.startswith('/api/'):
+            return http.server.SimpleHTTPRequestHandler.do_HEAD(self)
+        return self.serve_static(head_only=True)
+
+    def serve_static(self, head_only=False):
+        """Serve a static file from the cache, honouring Range and conditional headers"""
+        path = static_cache.routes.get(self.path)
+        if path is None:
+            path = self.translate_path(self.path)
+            if is_within(path, profiler.output_dir):
+                # Profiles name server paths and functions; they are not site content
+                self.send_error(404, "File not found")
+                return
+            if os.path.isdir(path):
+                # Directory redirects and listings are left to the stdlib handler
+                if head_only:
+                    return http.server.SimpleHTTPRequestHandler.do_HEAD(self)
+                return http.server.SimpleHTTPRequestHandler.do_GET(self)
+        try:
+            entry = static_cache.get(path, self.guess_type)
+        except OSError:
+            static_cache.forget(path)
+            self.send_error(404, "File not found")
+            return
+        static_cache.remember(self.path, path)
+
+        if self.is_not_modified(entry):
+            self.send_response(304)
+            self.send_header('ETag', entry.etag)
+            self.send_header('Last-Modified', entry.last_modified)
+            # No Content-Length: on a 304 it would describe the 200 body (RFC 9110 8.6)
+            self.end_headers()
+            return
+
+        range_header = self.headers.get('Range')
+        if range_header is None and entry.body is not None and not head_only:
+            self.log_request(200, entry.size)
+            if self.request_version == 'HTTP/0.9':
+                # HTTP/0.9 responses are the bare body
+                self.wfile.write(entry.body)
+                return
+            # The common case: status line, Server/Date and the prebuilt
+            # headers and body in one write
+            self.wfile.write(b"".join((
+                self.status_line_ok(), http_date(), entry.full_headers, entry.body
+            )))
+            return
+
+        status, start, end = 200, 0, entry.size - 1
+        if_range = self.headers.get('If-Range')
+        if range_header and entry.size and (if_range is None or if_range == entry.etag):
+            byte_range = parse_range(range_header, entry.size)
+            if byte_range is None:
+                self.send_response(416)
+                self.send_header('Content-Range', f"bytes */{entry.size}")
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            if byte_range:
+                status, (start, end) = 206, byte_range
+        length = end - start + 1
+
+        self.send_response(status)
+        self.send_header('Content-Type', entry.content_type)
+        self.send_header('Content-Length', str(length))
+        self.send_header('Last-Modified', entry.last_modified)
+        self.send_header('ETag', entry.etag)
+        self.send_header('Accept-Ranges', 'bytes')
+        if status == 206:
+            self.send_header('Content-Range', f"bytes {start}-{end}/{entry.size}")
+        if head_only or length <= 0:
+            self.end_headers()
+            return
+
+        if entry.body is not None:
+            # Send headers and a cached body in one write (one packet for small files)
+            self._headers_buffer.append(b"\r\n")
+            self._headers_buffer.append(entry.body[start:end + 1] if status == 206 else entry.body)
+            self.flush_headers()
+        else:
+            self.end_headers()
+            # Large file: let the kernel copy it straight to the socket
+            with open(entry.path, 'rb') as f:
+                self.connection.sendfile(f, start, length)
+
+    def status_line_ok(self):
+        return f"{self.protocol_version} 200 OK\r\nServer: {self.version_string()}\r\n".encode('latin-1')
+
+    def is_not_modified(self, entry):
+        """True if the client's cached copy (ETag or date) is still current"""
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match is not None:
+            return entry.etag in [tag.strip() for tag in if_none_match.split(',')] or if_none_match.strip() == '*'
+        if_modified_since = self.headers.get('If-Modified-Since')
+        if if_modified_since:
+            try:
+                since = email.utils.parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError, IndexError, OverflowError):
+                return False
+            return entry.mtime // 1_000_000_000 <= since
+        return False
     
-    def handle_api_request(self, endpoint):
-        """Handle API requests with sample data"""
+    def handle_api_request(self, endpoint, query=None):
+        """Handle API requests from the latest data files (see news_data.py)"""
         try:
-            if endpoint == 'healthcare':
-                data = {
-                    "daily_take": "Breakthrough gene therapy shows promising results in early trials for rare childhood disease, while FDA faces pressure to streamline approval processes for life-saving treatments.",
-                    "stories": [
-                        {
-                            "headline": "FDA Announces New Fast-Track Program for Gene Therapies",
-                            "summary": "The FDA has unveiled a new expedited review pathway aimed at accelerating the approval of gene therapies for rare diseases, potentially cutting approval times by up to 50%.",
-                            "source": "STAT News",
-                            "importance": 5,
-                            "impact_to_me": 4,
-                            "category": "Policy"
-                        },
-                        {
-                            "headline": "Revolutionary CAR-T Cell Therapy Shows 90% Remission Rate",
-                            "summary": "A new CAR-T cell therapy targeting pediatric leukemia has demonstrated remarkable efficacy in Phase II trials, with 90% of patients achieving complete remission after six months.",
-                            "source": "The Lancet",
-                            "importance": 5,
-                            "impact_to_me": 5,
-                            "category": "Research"
-                        },
-                        {
-                            "headline": "Telehealth Reimbursement Rules Expanded for Rural Areas",
-                            "summary": "CMS has expanded Medicare reimbursement for telehealth services in rural communities, removing geographic restrictions that previously limited access to virtual care.",
-                            "source": "Fierce Healthcare",
-                            "importance": 4,
-                            "impact_to_me": 3,
-                            "category": "Policy"
-                        },
-                        {
-                            "headline": "AI Diagnostic Tool Achieves Radiologist-Level Accuracy",
-                            "summary": "A new artificial intelligence system for detecting lung cancer on CT scans has matched or exceeded the diagnostic accuracy of experienced radiologists in a large clinical trial.",
-                            "source": "NEJM",
-                            "importance": 4,
-                            "impact_to_me": 4,
-                            "category": "Tech"
-                        },
-                        {
-                            "headline": "Pharma Giants Merge in $50B Deal to Focus on Rare Diseases",
-                            "summary": "Two major pharmaceutical companies have announced a merger valued at $50 billion, creating a new entity that will focus exclusively on developing treatments for ultra-rare genetic disorders.",
-                            "source": "Fierce Pharma",
-                            "importance": 3,
-                            "impact_to_me": 2,
-                            "category": "Business"
-                        }
-                    ]
-                }
-                self.send_json_response(data)
-            elif endpoint == 'general':
-                data = {
-                    "daily_take": "Major tech companies announce breakthroughs in quantum computing while global markets react to new AI regulations from leading economies.",
-                    "stories": [
-                        {
-                            "headline": "Quantum Supremacy Claimed by Three Major Tech Companies",
-                            "summary": "Google, IBM, and a leading Chinese tech firm have simultaneously announced they've achieved quantum supremacy, solving complex problems in minutes that would take traditional supercomputers millennia.",
-                            "source": "The Economist",
-                            "importance": 5,
-                            "impact_to_me": 5,
-                            "category": "Technology"
-                        },
-                        {
-                            "headline": "Global AI Regulation Framework Agreed by G7 Nations",
-                            "summary": "G7 countries have reached a preliminary agreement on a unified framework for AI governance, establishing new standards for transparency and safety in artificial intelligence development.",
-                            "source": "Reuters",
-                            "importance": 5,
-                            "impact_to_me": 4,
-                            "category": "Global"
-                        },
-                        {
-                            "headline": "Renewable Energy Investments Surpass Fossil Fuels for First Time",
-                            "summary": "Global investment in renewable energy projects has exceeded fossil fuel investments for the first time in history, signaling a major shift in the energy sector's trajectory.",
-                            "source": "BBC",
-                            "importance": 4,
-                            "impact_to_me": 3,
-                            "category": "Business"
-                        },
-                        {
-                            "headline": "Breakthrough in Nuclear Fusion Energy Achieved",
-                            "summary": "Scientists at a major research facility have achieved a net energy gain in nuclear fusion, bringing humanity one step closer to unlimited clean energy.",
-                            "source": "AP News",
-                            "importance": 5,
-                            "impact_to_me": 5,
-                            "category": "Science"
-                        },
-                        {
-                            "headline": "Global Supply Chain Disruptions Ease as New Routes Established",
-                            "summary": "International trade organizations report significant improvements in global supply chain resilience following the establishment of alternative shipping routes and digital logistics platforms.",
-                            "source": "WSJ",
-                            "importance": 3,
-                            "impact_to_me": 3,
-                            "category": "Business"
-                        }
-                    ]
-                }
-                self.send_json_response(data)
+            day = (query or {}).get('date', [None])[0]
+            if endpoint in CATEGORIES and day:
+                # A past day, from data/ or the monthly archive
+                body = news_cache.briefing_json(endpoint, day)
+                if body is None:
+                    self.send_error(404, f"No {endpoint} briefing for {day}")
+                    return
+                self.send_json_bytes(body)
+            elif endpoint in CATEGORIES:
+                self.send_json_bytes(news_cache.get_json(endpoint))
+            elif endpoint == 'latest':
+                self.send_json_bytes(news_cache.latest_json())
+            elif endpoint == 'stats':
+                self.send_json_bytes(stats_cache.get_json())
+            elif endpoint == 'rank':
+                self.send_json_response(rank_request({}))
             else:
                 self.send_error(404, "API endpoint not found")
         except Exception as e:
             self.send_error(500, f"Internal server error: {str(e)}")
     
+    def handle_profiling_admin(self, settings=None):
+        """Profiling status; a POSTed JSON body like {"sample_rate": 0.1} changes it"""
+        if not profiler.is_admin(self.headers.get('X-Admin-Token')):
+            self.send_error(403, "Forbidden")
+            return
+        if settings is None:
+            self.send_json_response(profiler.status())
+            return
+        try:
+            if not isinstance(settings, dict):
+                raise ValueError("expected a JSON object")
+            status = profiler.configure(settings.get('sample_rate'), settings.get('interval'))
+        except (TypeError, ValueError) as e:
+            self.send_error(400, str(e))
+            return
+        self.send_json_response(status)
+
     def send_json_response(self, data):
         """Send JSON response"""
+        self.send_json_bytes(json.dumps(data).encode())
+
+    def send_json_bytes(self, body):
+        """Send an already-encoded JSON response"""
         self.send_response(200)
         self.send_header('Content-type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
         self.send_header('Access-Control-Allow-Origin', '*')
         self.end_headers()
-        self.wfile.write(json.dumps(data).encode())
+        self.wfile.write(body)
+
+class PooledHTTPServer(http.server.HTTPServer):
+    """HTTP server that hands connections to a fixed pool of worker threads
+
+    At most `workers` connections are served at once and at most
+    `max_pending` wait in the queue; beyond that, new connections wait in
+    the kernel's listen backlog until a slot frees up.
+    """
+    request_queue_size = 128
+
+    def __init__(self, server_address, handler_class, workers=16, max_pending=64):
+        super().__init__(server_address, handler_class)
+        self._pending = queue.Queue(maxsize=max_pending)
+        self._workers = [
+            threading.Thread(target=self._work, name=f"http-worker-{i}", daemon=True)
+            for i in range(max(1, workers))
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def process_request(self, request, client_address):
+        # Blocks the accept loop while the queue is full
+        self._pending.put((request, client_address))
+
+    def connections_waiting(self):
+        """True if accepted connections are queued for a free worker"""
+        return not self._pending.empty()
+
+    def _work(self):
+        while True:
+            item = self._pending.get()
+            if item is None:
+                return
+            request, client_address = item
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        for _ in self._workers:
+            try:
+                self._pending.put_nowait(None)
+            except queue.Full:
+                break
 
-def run_server(port=8000):
+def run_server(port=8000, workers=16, keepalive_timeout=KEEPALIVE_TIMEOUT):
     """Run the HTTP server"""
-    with socketserver.TCPServer(("", port), NewsDashboardHandler) as httpd:
+    NewsDashboardHandler.timeout = keepalive_timeout
+    with PooledHTTPServer(("", port), NewsDashboardHandler, workers=workers) as httpd:
         print(f"Server running at http://localhost:{port}/")
         print("Press Ctrl+C to stop the server")
         try:
@@ -148,4 +603,10 @@ def run_server(port=8000):
             print("\nServer stopped.")
 
 if __name__ == "__main__":
-    run_server()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Serve the news dashboard with the standard library only")
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=16, help="Connections served concurrently")
+    parser.add_argument('--keepalive-timeout', type=float, default=KEEPALIVE_TIMEOUT,
+                        help="Seconds an idle connection is kept open")
+    args = parser.parse_args()
+    run_server(args.port, workers=args.workers, keepalive_timeout=args.keepalive_timeout)
\ No newline at end of file
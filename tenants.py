@@ -0,0 +1,245 @@
+"""
+Per-Tenant Briefings
+
+Teams (tenants) subscribe to topics in tenants.json (see
+tenants.example.json). A topic is either one of the built-in briefings
+("healthcare", "general") or a custom topic defined in the same file on top
+of a built-in profile:
+
+    {"topics": {"cardiology": {"base": "healthcare", "topic": "cardiology",
+                               "categories": ["Research", "Pharma", "Policy"]}},
+     "tenants": {"heart-team": {"topics": {"cardiology": ["Research"], "healthcare": null}},
+                 "ops-team": {"topics": ["healthcare", "general"]}}}
+
+A subscription may list the story categories the tenant wants (null or a
+plain list of topic names means all of them). The weekly top story is kept
+only if it is in one of those categories (otherwise it is null), and a day
+with no matching stories writes no file for that tenant.
+
+The planner groups every subscription by the upstream prompt that serves it,
+so each distinct prompt is fetched once per day, however many tenants want
+it. Results are cached in data/topics/ (built-in topics reuse the global
+data/<date>-<category>.json files) and fanned out to
+data/tenants/<tenant>/<date>-<topic>.json, filtered to each tenant's
+categories. retention.py archives both directories like data/ itself. Upstream calls go through backend.fetch_news_perplexity and
+therefore the shared rate limiter.
+
+    python tenants.py                  # today's briefings for every tenant
+    python tenants.py --plan           # show the upstream prompts without fetching
+    python tenants.py --date 2026-02-18 --config tenants.json
+"""
+
+import os
+import re
+import json
+import hashlib
+import argparse
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import backend
+from backfill import is_valid_data_file, is_valid_briefing
+from news_data import DATA_DIR, archive_path, read_archive
+from prompts import CATEGORY_PROFILES, build_profile_prompt
+
+TENANTS_FILE = os.environ.get('NEWS_TENANTS_FILE', 'tenants.json')
+TENANTS_DIR = os.path.join(DATA_DIR, 'tenants')
+TOPICS_DIR = os.path.join(DATA_DIR, 'topics')
+
+# Tenant and topic names become path components
+NAME_PATTERN = re.compile(r'^[a-z0-9][a-z0-9_-]*$')
+
+# Profile fields a custom topic may override
+TOPIC_FIELDS = ('topic', 'role', 'reader', 'summary_focus', 'categories')
+
+# Files listed per topic in each tenant's index.json
+INDEX_FILES_PER_TOPIC = 5
+
+
+def load_config(path=TENANTS_FILE):
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def topic_profile(name, topics):
+    """Prompt profile for a topic: a custom topic from the config or a built-in category"""
+    if name in topics:
+        spec = topics[name]
+        base = spec.get('base', 'general')
+        if base not in CATEGORY_PROFILES:
+            raise ValueError(f"topic {name!r}: unknown base {base!r}")
+        profile = dict(CATEGORY_PROFILES[base], topic=name)
+        profile.update({field: spec[field] for field in TOPIC_FIELDS if field in spec})
+        return profile
+    if name in CATEGORY_PROFILES:
+        return CATEGORY_PROFILES[name]
+    raise ValueError(f"unknown topic {name!r}")
+
+
+def plan(config):
+    """Group every tenant subscription by the upstream prompt that serves it"""
+    topics = config.get('topics') or {}
+    builtin = {prompt: category for category, prompt in backend.CATEGORY_PROMPTS.items()}
+    fetches = {}
+    for tenant, spec in sorted((config.get('tenants') or {}).items()):
+        if not NAME_PATTERN.match(tenant):
+            raise ValueError(f"invalid tenant name {tenant!r}")
+        subscriptions = spec.get('topics') or []
+        if isinstance(subscriptions, list):
+            subscriptions = {name: None for name in subscriptions}
+        for name, categories in sorted(subscriptions.items()):
+            if not NAME_PATTERN.match(name):
+                raise ValueError(f"invalid topic name {name!r}")
+            profile = topic_profile(name, topics)
+            unknown = set(categories or []) - set(profile['categories'])
+            if unknown:
+                raise ValueError(f"{tenant}/{name}: categories {sorted(unknown)} not in {profile['categories']}")
+            prompt = build_profile_prompt(profile)
+            # Identical prompts share one fetch; editing a topic changes its key
+            key = hashlib.sha256(prompt.encode()).hexdigest()[:12]
+            fetch = fetches.setdefault(key, {
+                "key": key,
+                "topic": name,
+                "prompt": prompt,
+                "category": builtin.get(prompt),
+                "subscribers": [],
+            })
+            fetch['subscribers'].append({"tenant": tenant, "topic": name, "categories": categories})
+    return list(fetches.values())
+
+
+def cache_file(fetch, day, data_dir=DATA_DIR):
+    """Where the shared result of one fetch for one day is kept"""
+    if fetch['category']:
+        return os.path.join(data_dir, f"{day}-{fetch['category']}.json")
+    return os.path.join(data_dir, 'topics', f"{day}-{fetch['topic']}-{fetch['key']}.json")
+
+
+def fetch_shared(fetch, day, force=False, data_dir=DATA_DIR):
+    """Cached result of one upstream prompt for one day; returns (data, source)"""
+    filename = cache_file(fetch, day, data_dir)
+    if not force and is_valid_data_file(filename):
+        with open(filename, 'r') as f:
+            return json.load(f), 'cached'
+    if not force:
+        # retention.py may have moved older days into <dir>/archive/YYYY-MM.json.gz
+        bundle = archive_path(day[:7], os.path.dirname(filename))
+        data = read_archive(bundle).get(os.path.basename(filename)) if os.path.exists(bundle) else None
+        if is_valid_briefing(data):
+            return data, 'cached'
+    if not backend.PERPLEXITY_API_KEY:
+        return None, 'no API key'
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    run_date = datetime.strptime(day, '%Y-%m-%d').date()
+    if run_date == datetime.now().date():
+        run_date = None
+    data = backend.fetch_news_perplexity(fetch['prompt'], filename, run_date=run_date)
+    if data is None:
+        return None, 'fetch failed'
+    if fetch['category']:
+        # A built-in briefing written here is the global one, so index it too
+        backend.update_indexes(day, fetch['category'], data)
+    return data, 'fetched'
+
+
+def write_json(filename, data):
+    tmp_filename = f"{filename}.tmp"
+    with open(tmp_filename, 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_filename, filename)
+
+
+def fan_out(fetch, data, day, data_dir=DATA_DIR):
+    """Write one shared result to every subscribed tenant, filtered to its categories; returns files skipped"""
+    skipped = 0
+    for subscriber in fetch['subscribers']:
+        tenant_data = dict(data)
+        if subscriber['categories']:
+            wanted = set(subscriber['categories'])
+            tenant_data['stories'] = [
+                s for s in data.get('stories') or [] if isinstance(s, dict) and s.get('category') in wanted
+            ]
+            top = data.get('weekly_top_story')
+            if not (isinstance(top, dict) and top.get('category') in wanted):
+                # A top story from another category would get past the filter
+                tenant_data['weekly_top_story'] = None
+            if not tenant_data['stories']:
+                print(f"No {'/'.join(subscriber['categories'])} stories in {day}'s {subscriber['topic']} briefing; "
+                      f"nothing written for {subscriber['tenant']}")
+                skipped += 1
+                continue
+        tenant_dir = os.path.join(data_dir, 'tenants', subscriber['tenant'])
+        os.makedirs(tenant_dir, exist_ok=True)
+        write_json(os.path.join(tenant_dir, f"{day}-{subscriber['topic']}.json"), tenant_data)
+    return skipped
+
+
+def update_tenant_index(tenant, data_dir=DATA_DIR):
+    """Newest files per topic in data/tenants/<tenant>/index.json, like data/index.json"""
+    tenant_dir = os.path.join(data_dir, 'tenants', tenant)
+    index = {}
+    for name in sorted(os.listdir(tenant_dir), reverse=True):
+        match = re.match(r'^\d{4}-\d{2}-\d{2}-(.+)\.json$', name)
+        if match:
+            files = index.setdefault(match.group(1), [])
+            if len(files) < INDEX_FILES_PER_TOPIC:
+                files.append(name)
+    write_json(os.path.join(tenant_dir, 'index.json'), index)
+
+
+def run_tenants(day=None, config_path=TENANTS_FILE, workers=4, force=False, data_dir=DATA_DIR):
+    """Generate one day's briefings for every tenant in the config"""
+    day = day or datetime.now().strftime('%Y-%m-%d')
+    fetches = plan(load_config(config_path))
+    subscriptions = sum(len(f['subscribers']) for f in fetches)
+    tenants = sorted({s['tenant'] for f in fetches for s in f['subscribers']})
+    print(f"Tenant briefings for {day}: {len(tenants)} tenants, {subscriptions} subscriptions, "
+          f"{len(fetches)} upstream prompts")
+
+    sources = {}
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {pool.submit(fetch_shared, fetch, day, force, data_dir): fetch for fetch in fetches}
+        for future in as_completed(futures):
+            fetch = futures[future]
+            try:
+                data, source = future.result()
+            except Exception as e:
+                data, source = None, f"error: {e}"
+            sources[source] = sources.get(source, 0) + 1
+            if data is None:
+                print(f"No {fetch['topic']} briefing for {day} ({source}); "
+                      f"skipping {len(fetch['subscribers'])} subscriptions")
+                continue
+            skipped = fan_out(fetch, data, day, data_dir)
+            if skipped:
+                sources['empty for tenant'] = sources.get('empty for tenant', 0) + skipped
+
+    for tenant in tenants:
+        if os.path.isdir(os.path.join(data_dir, 'tenants', tenant)):
+            update_tenant_index(tenant, data_dir)
+    print(f"Tenant briefings complete: {sources}")
+    return sources
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate per-tenant briefings from shared upstream fetches")
+    parser.add_argument('--config', default=TENANTS_FILE, help="Tenant configuration (default: %(default)s)")
+    parser.add_argument('--date', help="Briefing date (YYYY-MM-DD, default: today)")
+    parser.add_argument('--workers', type=int, default=4, help="Concurrent upstream requests")
+    parser.add_argument('--force', action='store_true', help="Refetch prompts that already have a cached result")
+    parser.add_argument('--plan', action='store_true', help="Print the upstream prompts and exit")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.plan:
+        for fetch in plan(load_config(args.config)):
+            subscribers = ', '.join(
+                f"{s['tenant']}" + (f" ({'/'.join(s['categories'])})" if s['categories'] else '')
+                for s in fetch['subscribers']
+            )
+            source = f"global {fetch['category']} briefing" if fetch['category'] else f"topic {fetch['key']}"
+            print(f"{fetch['topic']:<16} {source:<28} -> {subscribers}")
+    else:
+        run_tenants(args.date, args.config, workers=args.workers, force=args.force)
@@ -28,6 +28,8 @@ load_env_file(env_file)
 
 # Get API key from environment variable
 PERPLEXITY_API_KEY = os.environ.get('PERPLEXITY_API_KEY')
+# Set to a local replay stub (python replay.py serve) to test without the live API
+PERPLEXITY_API_BASE = os.environ.get('PERPLEXITY_API_BASE', 'https://api.perplexity.ai').rstrip('/')
 
 if not PERPLEXITY_API_KEY:
     print("ERROR: PERPLEXITY_API_KEY not set.")
@@ -39,7 +41,7 @@ try:
     print("Testing API connection...")
     
     # Perplexity API endpoint
-    url = "https://api.perplexity.ai/chat/completions"
+    url = f"{PERPLEXITY_API_BASE}/chat/completions"
     
     # Headers
     headers = {
@@ -0,0 +1,101 @@
+"""
+Prompt regression test against recorded API fixtures
+
+Runs every briefing response recorded from the real API (python replay.py
+record) through backend.py's parse path and checks the result against the
+schema the prompts ask for (prompts.validate_briefing). It also fails when a
+fixture was recorded with a different prompt than backend.py sends now, so a
+prompt change must come with re-recorded fixtures before it passes.
+
+Fixtures built from existing data/ files (replay.py fixture_from_briefing,
+source "built from ...") are skipped: their responses were produced by
+whatever prompt wrote that file, not by the request they are stored under.
+Until at least one briefing per category has been recorded, the regression
+check does not run and the test says so (skipped under pytest).
+
+    python test_prompts.py      (or: python -m pytest test_prompts.py)
+"""
+
+import sys
+
+try:
+    import pytest
+except ImportError:
+    pytest = None
+
+import backend
+from prompts import SYSTEM_PROMPT, CATEGORY_PROFILES, validate_briefing
+from replay import load_fixtures, fixture_content
+
+
+def briefing_category(fixture):
+    """The category a fixture's request asks for, or None for other requests"""
+    messages = fixture['request']['body'].get('messages') or []
+    user = str(messages[-1].get('content', '')) if messages else ''
+    for category, profile in CATEGORY_PROFILES.items():
+        if user.startswith(f"Briefing request: {profile['topic']}\n"):
+            return category
+    return None
+
+
+def is_recorded(fixture):
+    """True for fixtures captured from the real API, not built from a data file"""
+    return not str(fixture.get('source', '')).startswith('built from')
+
+
+def check_fixtures(fixtures):
+    """Check every briefing fixture; returns (categories covered, problems)"""
+    covered, problems = set(), []
+    for fixture in fixtures:
+        category = briefing_category(fixture)
+        if category is None or not is_recorded(fixture):
+            continue
+        covered.add(category)
+        name = fixture.get('source') or fixture['key']
+        messages = fixture['request']['body']['messages']
+        # Dated (backfill) requests append a date context after the category prompt
+        if messages[0]['content'] != SYSTEM_PROMPT or \
+                not messages[-1]['content'].startswith(backend.CATEGORY_PROMPTS[category]):
+            problems.append(f"{name}: recorded with an older {category} prompt; re-record it")
+        try:
+            data = backend.parse_response_content(fixture_content(fixture))
+        except (KeyError, IndexError, TypeError, ValueError) as e:
+            problems.append(f"{name}: response does not parse: {e}")
+            continue
+        problems += [f"{name}: {problem}" for problem in validate_briefing(data, category)]
+    return covered, problems
+
+
+class FixturesMissing(Exception):
+    """No recorded fixture for some category, so the regression check cannot run"""
+
+
+def run_check():
+    covered, problems = check_fixtures(load_fixtures())
+    assert not problems, '\n'.join(problems)
+    missing = sorted(set(CATEGORY_PROFILES) - covered)
+    if missing:
+        raise FixturesMissing(f"no briefing recorded with `python replay.py record` for {missing}; "
+                              f"the prompt regression check is not running for them")
+    return covered
+
+
+def test_fixtures_match_prompt_schema():
+    try:
+        run_check()
+    except FixturesMissing as e:
+        if pytest is None:
+            raise
+        pytest.skip(str(e))
+
+
+if __name__ == "__main__":
+    try:
+        run_check()
+    except AssertionError as e:
+        print(f"✗ Prompt fixtures failed:\n{e}")
+        sys.exit(1)
+    except FixturesMissing as e:
+        print(f"⚠ Prompt regression check NOT run: {e}")
+        sys.exit(0)
+    print("✓ Every recorded briefing parses and matches the prompt schema")